@@ -0,0 +1,153 @@
+"""Benchmark HTTP handshakes with and without the shared connection pool.
+
+Starts N simulated Swidget devices as TLS servers on loopback, then polls
+each of them a few times, once with the legacy one-session-per-device
+``force_close`` transport and once through the shared keep-alive pool.
+
+    python benchmarks/bench_connection_pool.py --devices 50 --rounds 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+from aiohttp import ClientSession, TCPConnector, web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "swidget"))
+
+from swidgetclient.device import SwidgetDevice  # noqa: E402
+from swidgetclient.pool import SwidgetConnectionPool  # noqa: E402
+
+SUMMARY = {
+    "model": "SW-BENCH",
+    "mac": "24a160000000",
+    "version": "1.0.0",
+    "host": {"type": "outlet", "id": "bench", "components": [
+        {"id": "0", "functions": ["toggle", "power"]},
+        {"id": "1", "functions": ["toggle", "power"]},
+    ]},
+    "insert": {"type": "USB", "components": [{"id": "usb", "functions": ["toggle"]}]},
+}
+STATE = {
+    "connection": {"rssi": -50},
+    "host": {"components": {
+        "0": {"toggle": {"state": "on"}, "power": {"current": 12.5}},
+        "1": {"toggle": {"state": "off"}, "power": {"current": 0.0}},
+    }},
+    "insert": {"components": {"usb": {"toggle": {"state": "on"}}}},
+}
+
+
+def make_ssl_context(directory):
+    """Create a throwaway self-signed certificate for the simulated devices."""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+async def start_devices(count, context, connections):
+    """Start simulated devices and return their runners and host:port pairs."""
+
+    def track(handler):
+        async def _handler(request):
+            connections.add(request.transport.get_extra_info("peername"))
+            return await handler(request)
+        return _handler
+
+    async def summary(request):
+        return web.json_response(SUMMARY)
+
+    async def state(request):
+        return web.json_response(STATE)
+
+    async def name(request):
+        return web.json_response({"name": "Bench Device"})
+
+    runners, hosts = [], []
+    for _ in range(count):
+        app = web.Application()
+        app.router.add_get("/api/v1/summary", track(summary))
+        app.router.add_get("/api/v1/state", track(state))
+        app.router.add_get("/api/v1/name", track(name))
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=context)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        runners.append(runner)
+        hosts.append(f"127.0.0.1:{port}")
+    return runners, hosts
+
+
+class LegacySession:
+    """The per-device transport used before the shared pool existed."""
+
+    def __init__(self, secret_key):
+        connector = TCPConnector(force_close=True)
+        self.session = ClientSession(headers={"x-secret-key": secret_key}, connector=connector)
+
+    async def close(self):
+        await self.session.close()
+
+
+async def run_legacy(hosts, rounds):
+    sessions = [LegacySession("secret") for _ in hosts]
+    devices = [SwidgetDevice(host, "secret", ssl=False, use_websockets=False) for host in hosts]
+    for device, legacy in zip(devices, sessions):
+        device._pool = legacy
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(device.update() for device in devices))
+    elapsed = time.perf_counter() - start
+    await asyncio.gather(*(legacy.close() for legacy in sessions))
+    return elapsed
+
+
+async def run_pooled(hosts, rounds):
+    pool = SwidgetConnectionPool()
+    devices = [SwidgetDevice(host, "secret", ssl=False, use_websockets=False, pool=pool) for host in hosts]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(device.update() for device in devices))
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    return elapsed
+
+
+async def main(args):
+    # The client logs every state frame, which would drown the timings
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        context = make_ssl_context(directory)
+        results = []
+        for label, runner in (("legacy", run_legacy), ("pooled", run_pooled)):
+            connections = set()
+            servers, hosts = await start_devices(args.devices, context, connections)
+            elapsed = await runner(hosts, args.rounds)
+            results.append((label, elapsed, len(connections)))
+            for server in servers:
+                await server.cleanup()
+
+    requests = args.devices * args.rounds * 3
+    print(f"{args.devices} devices x {args.rounds} rounds = {requests} requests")
+    for label, elapsed, handshakes in results:
+        print(f"{label:>7}: {elapsed:8.3f}s  {handshakes:6d} TCP+TLS handshakes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
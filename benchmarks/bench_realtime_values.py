@@ -0,0 +1,51 @@
+"""Benchmark the cached realtime_values snapshot against rebuilding it per read.
+
+Every update, each sensor entity of a device reads realtime_values once. This
+replays that pattern: one applied delta followed by one read per sensor, with
+the dict rebuilt on each read as before, and with the per-version snapshot.
+
+    python benchmarks/bench_realtime_values.py --updates 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "swidget"))
+
+from bench_state_model import STATE, SUMMARY  # noqa: E402
+from swidgetclient.swidgetdimmer import SwidgetDimmer  # noqa: E402
+
+
+def run(device, read, updates):
+    """Apply ``updates`` deltas, reading every sensor value after each"""
+    keys = list(device.realtime_values)
+    start = time.perf_counter()
+    for i in range(updates):
+        device._apply_state({"insert": {"components": {"temperature": {"temperature": {"now": i}}}}})
+        device.state_version += 1
+        for key in keys:
+            read()[key]
+    return time.perf_counter() - start, len(keys)
+
+
+async def main(args):
+    logging.disable(logging.CRITICAL)
+    device = SwidgetDimmer("127.0.0.1", "secret", False)
+    await device.process_summary(SUMMARY)
+    await device.process_state(STATE)
+    rebuilt, sensors = run(device, device._build_realtime_values, args.updates)
+    cached, _ = run(device, lambda: device.realtime_values, args.updates)
+    print(f"{args.updates} updates, {sensors} sensor reads per update")
+    print(f"  rebuilt per read: {rebuilt * 1e6 / args.updates:6.2f} us/update")
+    print(f"  cached snapshot:  {cached * 1e6 / args.updates:6.2f} us/update")
+    await device._pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,157 @@
+"""Benchmark the slotted device state model against the nested dict model.
+
+Measures the memory held by the assemblies of N devices, and the cost of
+reading a dimmer's is_on and brightness through the old four-level dict
+lookups and through the typed attributes of the slotted model.
+
+    python benchmarks/bench_state_model.py --devices 150
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "swidget"))
+
+from swidgetclient.device import SwidgetAssembly  # noqa: E402
+from swidgetclient.swidgetdimmer import SwidgetDimmer  # noqa: E402
+
+SUMMARY = {
+    "model": "SW-BENCH",
+    "mac": "24a160000000",
+    "version": "1.0.0",
+    "host": {"type": "dimmer", "id": "bench", "components": [
+        {"id": "0", "functions": ["toggle", "level", "power", "timer"]},
+    ]},
+    "insert": {"type": "THA", "components": [
+        {"id": "temperature", "functions": ["temperature"]},
+        {"id": "humidity", "functions": ["humidity"]},
+        {"id": "motion", "functions": ["occupied"]},
+    ]},
+}
+STATE = {
+    "host": {"components": {"0": {
+        "toggle": {"state": "on"},
+        "level": {"now": 40, "default": 80},
+        "power": {"current": 12.5},
+        "timer": {"duration": 0},
+    }}},
+    "insert": {"components": {
+        "temperature": {"temperature": {"now": 21.5}},
+        "humidity": {"humidity": {"now": 45}},
+        "motion": {"occupied": {"state": False}},
+    }},
+}
+
+
+class LegacyAssembly:
+    """The nested dict model the slotted classes replaced"""
+
+    def __init__(self, summary):
+        self.type = summary["type"]
+        self.components = {
+            c["id"]: LegacyComponent(c["functions"]) for c in summary["components"]
+        }
+        self.id = summary.get("id")
+        self.error = summary.get("error")
+
+
+class LegacyComponent:
+    def __init__(self, functions):
+        self.functions = {f: None for f in functions}
+
+
+class LegacyDimmer(SwidgetDimmer):
+    """A dimmer reading its properties the way it did on the dict model"""
+
+    @property
+    def is_on(self) -> bool:
+        dimmer_state = self.assemblies['host'].components["0"].functions['toggle']["state"]
+        if dimmer_state == "on":
+            return True
+        return False
+
+    @property
+    def brightness(self) -> int:
+        try:
+            return self.assemblies['host'].components["0"].functions["level"]["now"]
+        except KeyError:
+            return self.assemblies['host'].components["0"].functions["level"]["default"]
+
+
+def legacy_assemblies():
+    assemblies = {
+        "host": LegacyAssembly(SUMMARY["host"]),
+        "insert": LegacyAssembly(SUMMARY["insert"]),
+    }
+    for assembly, data in STATE.items():
+        for component, functions in data["components"].items():
+            # Copies, as every websocket frame is decoded into fresh dicts
+            assemblies[assembly].components[component].functions.update(
+                {name: dict(value) for name, value in functions.items()}
+            )
+    return assemblies
+
+
+def slotted_assemblies():
+    """Build the slotted assemblies of one device the way process_summary does"""
+    assemblies = {
+        "host": SwidgetAssembly(SUMMARY["host"]),
+        "insert": SwidgetAssembly(SUMMARY["insert"]),
+    }
+    for assembly, data in STATE.items():
+        for component, functions in data["components"].items():
+            for name, value in functions.items():
+                assemblies[assembly].components[component].apply(name, dict(value))
+    return assemblies
+
+
+async def slotted_device():
+    device = SwidgetDimmer("127.0.0.1", "secret", False)
+    await device.process_summary(SUMMARY)
+    device._apply_state(STATE)
+    return device
+
+
+def measure(build, count):
+    """Return the bytes allocated per item by building ``count`` of them"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    items = [build() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return allocated / count, items
+
+
+async def main(args):
+    logging.disable(logging.CRITICAL)
+    legacy_bytes, legacy = measure(legacy_assemblies, args.devices)
+    device = await slotted_device()
+    slotted_bytes, _ = measure(slotted_assemblies, args.devices)
+    print(f"{args.devices} devices")
+    print(f"  dict model:    {legacy_bytes:8.0f} bytes of state per device")
+    print(f"  slotted model: {slotted_bytes:8.0f} bytes of state per device")
+
+    legacy_device = LegacyDimmer("127.0.0.1", "secret", False)
+    legacy_device.assemblies = legacy[0]
+    reads = {
+        "is_on, dict model": lambda: legacy_device.is_on,
+        "is_on, slotted": lambda: device.is_on,
+        "brightness, dict model": lambda: legacy_device.brightness,
+        "brightness, slotted": lambda: device.brightness,
+    }
+    for label, read in reads.items():
+        seconds = min(timeit.repeat(read, number=args.reads, repeat=5))
+        print(f"  {label:>22}: {seconds * 1e9 / args.reads:6.1f} ns/read")
+    await device._pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=150)
+    parser.add_argument("--reads", type=int, default=1000000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""Benchmark state frame processing with tracing off and on.
+
+Feeds DYNAMIC_UPDATE frames from a sensor insert through
+``SwidgetDevice.process_state`` and compares it with the bare state applier,
+with tracing enabled, and with the f-string error logging the client used
+to do on every frame.
+
+    python benchmarks/bench_trace.py --frames 200000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "swidget"))
+
+from swidgetclient.device import SwidgetDevice  # noqa: E402
+from swidgetclient.trace import TRACE_ALL, TRACE_STATE  # noqa: E402
+
+SUMMARY = {
+    "model": "SW-BENCH",
+    "mac": "24a160000000",
+    "version": "1.0.0",
+    "host": {"type": "switch", "id": "bench", "components": [{"id": "0", "functions": ["toggle"]}]},
+    "insert": {"type": "THA", "components": [
+        {"id": "temperature", "functions": ["temperature"]},
+        {"id": "humidity", "functions": ["humidity"]},
+    ]},
+}
+
+
+def frames(count):
+    """Return sensor updates whose values change on every frame"""
+    return [
+        {
+            "request_id": "DYNAMIC_UPDATE",
+            "insert": {"components": {
+                "temperature": {"temperature": {"now": 20 + (i % 50) / 10}},
+                "humidity": {"humidity": {"now": 40 + (i % 30)}},
+            }},
+        }
+        for i in range(count)
+    ]
+
+
+async def bench(label, handler, states):
+    start = time.perf_counter()
+    for state in states:
+        await handler(state)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>24}: {elapsed * 1e9 / len(states):8.0f} ns/frame")
+    return elapsed
+
+
+async def main(args):
+    logger = logging.getLogger("swidgetclient")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    device = SwidgetDevice("127.0.0.1", "secret", use_websockets=False)
+    await device.process_summary(SUMMARY)
+    states = frames(args.frames)
+
+    async def bare(state):
+        return device._apply_state(state)
+
+    async def legacy(state):
+        # What process_state logged at error level for every frame before tracing existed
+        logger.error(f"Processing state: {state}")
+        changed = device._apply_state(state)
+        logger.error(f"Finished getting state: {device.__dict__}")
+        logger.error(f"Finished getting state: {device.assemblies['host']}")
+        logger.error(f"Finished getting state: {device.assemblies['insert']}")
+        return changed
+
+    logger.setLevel(logging.WARNING)
+    await bench("bare state applier", bare, states)
+    await bench("process_state, trace off", device.process_state, states)
+    await bench("legacy error logging", legacy, states)
+    logger.setLevel(logging.DEBUG)
+    device.set_trace_level(TRACE_STATE)
+    await bench("trace state, sampled", device.process_state, states)
+    device.set_trace_level(TRACE_ALL)
+    await bench("trace all", device.process_state, states)
+    await device._pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200000)
+    asyncio.run(main(parser.parse_args()))
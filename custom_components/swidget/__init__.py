@@ -1,44 +1,134 @@
 """The Swidget integration."""
 from __future__ import annotations
 
+import asyncio
 from datetime import timedelta
+import time
 from typing import Any
 import logging
 
 from .swidgetclient.device import SwidgetDevice
+from .swidgetclient.device_cache import get_device_cache
 from .swidgetclient.exceptions import SwidgetException
-from .swidgetclient.discovery import SwidgetDiscoveredDevice, discover_devices, discover_single
+from .swidgetclient.discovery import (
+    DISCOVERY_REMOVED,
+    SwidgetDiscoveredDevice,
+    SwidgetDiscovery,
+    SwidgetDiscoveryIndex,
+    discover_devices,
+    discover_single,
+)
+from .swidgetclient.group import (
+    DEFAULT_GROUP_CONCURRENCY,
+    DEFAULT_GROUP_TIMEOUT,
+    send_group_command,
+)
+from .swidgetclient.pool import close_connection_pool
+from .swidgetclient.sweep import sweep_network
+from .swidgetclient.telemetry import ROLLUP_RESOLUTIONS
+from .swidgetclient.trace import TRACE_ALL, TRACE_OFF
+import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.components import network
 from homeassistant.config_entries import ConfigEntry
 
 from homeassistant.const import (
+    Platform,
     CONF_NAME,
     CONF_HOST,
     CONF_MAC,
     EVENT_HOMEASSISTANT_STARTED,
+    EVENT_HOMEASSISTANT_STOP,
 )
 
-from homeassistant.core import callback, HomeAssistant
+from homeassistant.core import callback, HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.service import async_extract_config_entry_ids
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, PLATFORMS
+from .const import (
+    CONF_TELEMETRY,
+    DATA_DISCOVERY,
+    DATA_DISCOVERY_INDEX,
+    DATA_PLATFORMS,
+    DATA_SCHEDULER,
+    DATA_STARTUP,
+    DEFAULT_TELEMETRY,
+    DOMAIN,
+)
 from .coordinator import SwidgetDataUpdateCoordinator
+from .startup import (
+    SwidgetSetupScheduler,
+    SwidgetStartupTimings,
+)
 
 _LOGGER = logging.getLogger(__name__)
 DISCOVERY_INTERVAL = timedelta(minutes=15)
+# Stop waiting for the first websocket state of an entry after this long
+FIRST_STATE_TIMEOUT = 300
+# The longest an entry holds a setup slot waiting for its first state
+SYNC_SLOT_TIMEOUT = 30
+
+SERVICE_GROUP_COMMAND = "group_command"
+ATTR_ASSEMBLY = "assembly"
+ATTR_COMPONENT = "component"
+ATTR_FUNCTION = "function"
+ATTR_COMMAND = "command"
+ATTR_CONCURRENCY = "concurrency"
+ATTR_TIMEOUT = "timeout"
+GROUP_COMMAND_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional(ATTR_ASSEMBLY, default="host"): cv.string,
+        vol.Optional(ATTR_COMPONENT, default="0"): cv.string,
+        vol.Required(ATTR_FUNCTION): cv.string,
+        vol.Required(ATTR_COMMAND): dict,
+        vol.Optional(ATTR_CONCURRENCY, default=DEFAULT_GROUP_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=256)
+        ),
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_GROUP_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=60)
+        ),
+    }
+)
+
+SERVICE_SET_TRACE_LEVEL = "set_trace_level"
+ATTR_LEVEL = "level"
+ATTR_SAMPLE_RATE = "sample_rate"
+SET_TRACE_LEVEL_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Required(ATTR_LEVEL): vol.All(vol.Coerce(int), vol.Range(min=TRACE_OFF, max=TRACE_ALL)),
+        vol.Optional(ATTR_SAMPLE_RATE): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+SERVICE_GET_TELEMETRY = "get_telemetry"
+ATTR_METRIC = "metric"
+ATTR_RESOLUTION = "resolution"
+GET_TELEMETRY_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional(ATTR_METRIC): cv.string,
+        vol.Optional(ATTR_RESOLUTION, default="1m"): vol.In(["raw", *ROLLUP_RESOLUTIONS]),
+    }
+)
 
 
 @callback
 def async_trigger_discovery(
     hass: HomeAssistant,
-    discovered_devices: dict[str, SwidgetDevice],
+    discovered_devices: dict[str, SwidgetDiscoveredDevice],
 ) -> None:
-    """Trigger config flows for discovered devices."""
+    """Trigger config flows for discovered devices that are new or moved."""
+    index: SwidgetDiscoveryIndex = hass.data[DATA_DISCOVERY_INDEX]
     for mac, device in discovered_devices.items():
+        if not index.is_new(dr.format_mac(mac), device):
+            continue
         hass.async_create_task(
             hass.config_entries.flow.async_init(
                 DOMAIN,
@@ -51,61 +141,285 @@ def async_trigger_discovery(
             )
         )
 
-async def async_discover_devices(hass: HomeAssistant) -> dict[str, SwidgetDevice]:
-    """Force discover Swidget devices using """
-    # broadcast_addresses = await network.async_get_ipv4_broadcast_addresses(hass)
-    # tasks = [Discover.discover(target=str(address)) for address in broadcast_addresses]
-    discovered_devices: dict[str, SwidgetDiscoveredDevice] = await discover_devices()
-    # for device in discovered_devices:
-    #     discovered_devices[dr.format_mac(device.mac)] = device
-    _LOGGER.error(f"Forced Swidget Discovery found: {discovered_devices}")
+async def async_discover_devices(hass: HomeAssistant) -> dict[str, SwidgetDiscoveredDevice]:
+    """Return the Swidget devices on the network
+
+    The listener started in async_setup already knows the devices that
+    announced themselves, so a search is only waited for when it knows none.
+    """
+    discovery: SwidgetDiscovery | None = hass.data.get(DATA_DISCOVERY)
+    if discovery is None:
+        return await discover_devices()
+    if not discovery.devices:
+        await discovery.search()
+    else:
+        hass.async_create_task(discovery.search())
+    _LOGGER.debug(f"Swidget discovery knows: {discovery.devices}")
+    return dict(discovery.devices)
+
+async def async_get_ipv4_interfaces(hass: HomeAssistant) -> list[str]:
+    """Return the IPv4 interfaces of the enabled adapters, e.g. 192.168.1.10/24"""
+    return [
+        f"{address['address']}/{address['network_prefix']}"
+        for adapter in await network.async_get_adapters(hass)
+        if adapter["enabled"]
+        for address in adapter["ipv4"]
+    ]
+
+async def async_sweep_devices(
+    hass: HomeAssistant, networks: list[str] | None = None
+) -> dict[str, SwidgetDiscoveredDevice]:
+    """Probe networks over HTTP for devices that SSDP cannot reach
+
+    Without networks, the IPv4 networks of Home Assistant's enabled
+    adapters are swept.
+    """
+    if networks is None:
+        networks = await async_get_ipv4_interfaces(hass)
+    discovered_devices: dict[str, SwidgetDiscoveredDevice] = {}
+    for cidr in networks:
+        try:
+            async for device in sweep_network(cidr):
+                discovered_devices[device.mac] = device
+        except SwidgetException as ex:
+            _LOGGER.warning(f"Not sweeping {cidr}: {ex}")
+    _LOGGER.debug(f"Swidget sweep of {networks} found: {discovered_devices}")
     return discovered_devices
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Swidget component."""
+    setup_start = time.monotonic()
     hass.data[DOMAIN] = {}
+    hass.data[DATA_PLATFORMS] = {}
+    startup = SwidgetStartupTimings()
+    hass.data[DATA_STARTUP] = startup
+    hass.data[DATA_SCHEDULER] = SwidgetSetupScheduler()
+
+    index = SwidgetDiscoveryIndex()
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.unique_id and CONF_HOST in entry.data:
+            index.seed(entry.unique_id, entry.data[CONF_HOST])
+    hass.data[DATA_DISCOVERY_INDEX] = index
 
-    if discovered_devices := await async_discover_devices(hass):
-        async_trigger_discovery(hass, discovered_devices)
+    @callback
+    def _async_discovery_event(event: str, device: SwidgetDiscoveredDevice) -> None:
+        if event != DISCOVERY_REMOVED:
+            async_trigger_discovery(hass, {device.mac: device})
+
+    async def _async_start_discovery() -> None:
+        """Start the discovery service and search, without holding up startup."""
+        start = time.monotonic()
+        # Search and listen on every VLAN the host is attached to
+        discovery = SwidgetDiscovery(interfaces=await async_get_ipv4_interfaces(hass))
+        await discovery.start()
+        discovery.add_listener(_async_discovery_event)
+        hass.data[DATA_DISCOVERY] = discovery
+        startup.discovery_start = round(time.monotonic() - start, 3)
+        # Answers reach _async_discovery_event as they arrive
+        await discovery.search()
 
     async def _async_discovery(*_: Any) -> None:
-        if discovered := await async_discover_devices(hass):
-            async_trigger_discovery(hass, discovered)
+        if (discovery := hass.data.get(DATA_DISCOVERY)) is not None:
+            await discovery.search()
+
+    @callback
+    def _async_stop_discovery(*_: Any) -> None:
+        if (discovery := hass.data.get(DATA_DISCOVERY)) is not None:
+            discovery.stop()
 
+    hass.async_create_background_task(_async_start_discovery(), "swidget discovery")
     hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, _async_discovery)
+    async def _async_close_connections(*_: Any) -> None:
+        """Stop every websocket, then release the shared keep-alive connections."""
+        for coordinator in hass.data[DOMAIN].values():
+            await coordinator.device.stop()
+        await close_connection_pool()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop_discovery)
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_connections)
     async_track_time_interval(hass, _async_discovery, DISCOVERY_INTERVAL)
+
+    async def _async_group_command(call: ServiceCall) -> ServiceResponse:
+        """Send one command to many Swidget devices concurrently."""
+        targets = await _async_coordinators_for_call(hass, call)
+        results = await send_group_command(
+            [coordinator.device for coordinator in targets],
+            call.data[ATTR_ASSEMBLY],
+            call.data[ATTR_COMPONENT],
+            call.data[ATTR_FUNCTION],
+            call.data[ATTR_COMMAND],
+            concurrency=call.data[ATTR_CONCURRENCY],
+            timeout=call.data[ATTR_TIMEOUT],
+        )
+        return {
+            "succeeded": sum(result.success for result in results.values()),
+            "failed": sum(not result.success for result in results.values()),
+            "results": [result.as_dict() for result in results.values()],
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GROUP_COMMAND,
+        _async_group_command,
+        schema=GROUP_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _async_set_trace_level(call: ServiceCall) -> None:
+        """Turn message tracing on or off for Swidget devices."""
+        sample_rates = None
+        if ATTR_SAMPLE_RATE in call.data:
+            sample_rates = {"DYNAMIC_UPDATE": call.data[ATTR_SAMPLE_RATE]}
+        for coordinator in await _async_coordinators_for_call(hass, call):
+            coordinator.device.set_trace_level(call.data[ATTR_LEVEL], sample_rates)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_TRACE_LEVEL,
+        _async_set_trace_level,
+        schema=SET_TRACE_LEVEL_SCHEMA,
+    )
+
+    async def _async_get_telemetry(call: ServiceCall) -> ServiceResponse:
+        """Return the recent sensor history kept in memory by Swidget devices."""
+        return {
+            "devices": [
+                {
+                    "name": coordinator.device.friendly_name,
+                    "host": coordinator.device.ip_address,
+                    "metrics": coordinator.device.telemetry.query(
+                        call.data.get(ATTR_METRIC), call.data[ATTR_RESOLUTION]
+                    ),
+                }
+                for coordinator in await _async_coordinators_for_call(hass, call)
+                if coordinator.device.telemetry is not None
+            ]
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TELEMETRY,
+        _async_get_telemetry,
+        schema=GET_TELEMETRY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    startup.setup = round(time.monotonic() - setup_start, 3)
     return True
 
 
+async def _async_coordinators_for_call(
+    hass: HomeAssistant, call: ServiceCall
+) -> list[SwidgetDataUpdateCoordinator]:
+    """Return the coordinators a service call targets, or all of them without a target."""
+    coordinators: dict[str, SwidgetDataUpdateCoordinator] = hass.data[DOMAIN]
+    if not any(key in call.data for key in cv.ENTITY_SERVICE_FIELDS):
+        return list(coordinators.values())
+    entry_ids = await async_extract_config_entry_ids(hass, call)
+    return [coordinators[entry_id] for entry_id in entry_ids if entry_id in coordinators]
+
+
+@callback
+def async_platforms_for_device(device: SwidgetDevice) -> list[Platform]:
+    """Return the platforms that have entities for a device, from its summary and state."""
+    platforms = [Platform.BUTTON]
+    if device.is_dimmer:
+        platforms.append(Platform.LIGHT)
+    if device.is_outlet or device.is_switch or device.insert_type == "USB":
+        platforms.append(Platform.SWITCH)
+    values = device.realtime_values
+    if any(value is not None for key, value in values.items() if key != "occupied"):
+        platforms.append(Platform.SENSOR)
+    if values.get("occupied") is not None:
+        platforms.append(Platform.BINARY_SENSOR)
+    if "video" in device.insert_type:
+        platforms.append(Platform.CAMERA)
+    return platforms
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Swidget from a config entry."""
-    try:
-        _LOGGER.error(f"Setup Data: {entry.data}")
-        device: SwidgetDevice = await discover_single(entry.data['host'],
-                                                      entry.data['password'],
-                                                      False)
-    except SwidgetException as ex:
-        raise ConfigEntryNotReady from ex
+    startup: SwidgetStartupTimings = hass.data[DATA_STARTUP]
+    scheduler: SwidgetSetupScheduler = hass.data[DATA_SCHEDULER]
+    start = startup.start_entry(entry.entry_id)
+    device: SwidgetDevice | None = get_device_cache().pop(
+        entry.data['host'], entry.unique_id, secret_key=entry.data['password']
+    )
+    startup.entries[entry.entry_id]["adopted"] = device is not None
+    telemetry = entry.options.get(CONF_TELEMETRY, DEFAULT_TELEMETRY)
+    if device is not None and not telemetry:
+        device.telemetry = None
+    if device is None:
+        try:
+            _LOGGER.debug(f"Fetching the device at {entry.data['host']}")
+            async with scheduler.slot():
+                device = await discover_single(entry.data['host'],
+                                               entry.data['password'],
+                                               False,
+                                               telemetry=telemetry)
+        except SwidgetException as ex:
+            raise ConfigEntryNotReady from ex
+    startup.record(entry.entry_id, "device", start)
 
     # session = async_get_clientsession(hass)
     hass.data[DOMAIN][entry.entry_id] = SwidgetDataUpdateCoordinator(hass, device)
-    # hass.config_entries.async_setup_platforms(entry, PLATFORMS)
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    hass.loop.create_task(device._websocket.listen())
+    # Only the platforms with entities for this device are imported and set up
+    platforms = async_platforms_for_device(device)
+    hass.data[DATA_PLATFORMS][entry.entry_id] = platforms
+    await hass.config_entries.async_forward_entry_setups(entry, platforms)
+    startup.record(entry.entry_id, "entry_setup", start)
+
+    async def _async_connect() -> None:
+        """Connect the websocket when a slot is free, holding it until the first state."""
+        synced = None
+        try:
+            async with scheduler.slot():
+                if entry.entry_id not in hass.data[DOMAIN]:
+                    return
+                synced = hass.loop.create_task(device.wait_for_sync())
+                entry.async_create_background_task(
+                    hass, device._websocket.listen(), f"swidget websocket {entry.entry_id}"
+                )
+                # A device that is offline must not keep the others waiting
+                await asyncio.wait({synced}, timeout=SYNC_SLOT_TIMEOUT)
+            await asyncio.wait_for(synced, FIRST_STATE_TIMEOUT)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"No state from {device.ip_address} within {FIRST_STATE_TIMEOUT}s of setup")
+            return
+        finally:
+            if synced is not None:
+                synced.cancel()
+        startup.record(entry.entry_id, "first_state", start)
+        scheduler.ready(device.ip_address, start)
+
+    entry.async_create_background_task(
+        hass, _async_connect(), f"swidget connect {entry.entry_id}"
+    )
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     _LOGGER.error(" async_setup_entry returned")
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry so changed options apply to its device."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
     #     hass.data[DOMAIN].pop(entry.entry_id)
     # return unload_ok
     hass_data: dict[str, Any] = hass.data[DOMAIN]
-    device: SwidgetDevice = hass_data[entry.entry_id].device
+    coordinator: SwidgetDataUpdateCoordinator = hass_data[entry.entry_id]
+    coordinator.async_stop()
+    device = coordinator.device
     _LOGGER.error(f" async_unload_entry: {device}")
-    if device.use_websockets:
-        device._websocket.close()
-    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+    await device.stop()
+    platforms = hass.data[DATA_PLATFORMS].get(entry.entry_id, [])
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, platforms):
         hass_data.pop(entry.entry_id)
+        hass.data[DATA_PLATFORMS].pop(entry.entry_id, None)
+    if not hass_data:
+        # The last device is gone, release the shared keep-alive connections
+        await close_connection_pool()
     return unload_ok
@@ -99,7 +99,7 @@ class SwidgetBinarySensor(CoordinatedSwidgetEntity, SensorEntity):
         description: SwidgetBinarySensorEntityDescription,
     ) -> None:
         """Initialize the switch."""
-        super().__init__(device, coordinator)
+        super().__init__(device, coordinator, device.value_paths(description.emeter_attr))
         self.entity_description = description
         self._attr_unique_id = (
             f"{self.device}_{self.entity_description.key}"
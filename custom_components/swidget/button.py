@@ -44,7 +44,8 @@ class SwidgetIdentifyButton(CoordinatedSwidgetEntity, ButtonEntity):
         coordinator: SwidgetDataUpdateCoordinator,
     ) -> None:
         """Initialize the button entity."""
-        super().__init__(device, coordinator)
+        # Blinking has no state to render
+        super().__init__(device, coordinator, [])
         self.entity_description = ButtonEntityDescription(
             key="Blink",
             name="Blink",
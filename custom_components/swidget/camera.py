@@ -1,9 +1,8 @@
+"""Support for the Swidget video insert."""
+from __future__ import annotations
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.components.camera import Camera, CameraEntityFeature
-from homeassistant.components import ffmpeg
-from homeassistant.components.camera import Camera, CameraEntityFeature
-from homeassistant.components.ffmpeg import CONF_EXTRA_ARGUMENTS, get_ffmpeg_manager
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
@@ -11,7 +10,7 @@ from .const import DOMAIN
 from .coordinator import SwidgetDataUpdateCoordinator
 from .entity import CoordinatedSwidgetEntity
 
-from swidgetclient.device import SwidgetDevice
+from .swidgetclient.device import SwidgetDevice
 
 
 async def async_setup_entry(
@@ -39,7 +38,7 @@ class SwidgetCameraEntity(CoordinatedSwidgetEntity, Camera):
         coordinator: SwidgetDataUpdateCoordinator,
     ) -> None:
         """Initialize the switch."""
-        super().__init__(device, coordinator)
+        super().__init__(device, coordinator, [])
         Camera.__init__(self)
         self._extra_arguments: str = "-pred 1"
 
@@ -56,6 +55,9 @@ class SwidgetCameraEntity(CoordinatedSwidgetEntity, Camera):
         self, width: int | None = None, height: int | None = None
     ) -> bytes | None:
         """Return a still image response from the camera."""
+        # Only cameras need ffmpeg, so it is not imported with the platform
+        from homeassistant.components import ffmpeg
+
         return await ffmpeg.async_get_image(
             self.hass,
             f"rtsp://{self.device.ip_address}:8554/ph254",
@@ -7,8 +7,9 @@ from urllib.parse import urlparse
 
 from .swidgetclient.discovery import SwidgetDiscoveredDevice
 from homeassistant.helpers.device_registry import format_mac
-from . import async_discover_devices
-from .swidgetclient.device import SwidgetDevice
+from . import async_discover_devices, async_sweep_devices
+from .swidgetclient.device_cache import get_device_cache
+from .swidgetclient.discovery import discover_single
 from .swidgetclient.exceptions import SwidgetException
 import voluptuous as vol
 from homeassistant.helpers.typing import DiscoveryInfoType
@@ -21,7 +22,7 @@ from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import device_registry as dr
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DOMAIN
+from .const import CONF_TELEMETRY, DEFAULT_TELEMETRY, DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -56,11 +57,12 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     """
     # Return info that you want to store in the config entry.
     try:
-        d = SwidgetDevice(data['host'], data['password'], False)
-        await d.update()
-        return {"title": f"{d.friendly_name}"}
+        d = await discover_single(data['host'], data['password'], False)
     except:
         raise CannotConnect
+    # async_setup_entry adopts the device instead of fetching it all again
+    get_device_cache().put(d)
+    return {"title": f"{d.friendly_name}"}
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Swidget."""
@@ -69,8 +71,17 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize the config flow."""
         self._discovered_devices: dict[str, SwidgetDiscoveredDevice] = {}
         self._discovered_device: SwidgetDiscoveredDevice | None = None
+        # The host of a device this flow validated and cached for entry setup
+        self._validated_host: str | None = None
 
     VERSION = 1
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> SwidgetOptionsFlow:
+        """Get the options flow for this handler."""
+        return SwidgetOptionsFlow(config_entry)
+
     async def async_step_dhcp(self, discovery_info: dhcp.DhcpServiceInfo) -> FlowResult:
         """Handle discovery via dhcp."""
         _LOGGER.error("Swidget device found via DHCP: %s", discovery_info)
@@ -122,7 +133,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             _LOGGER.error(f"async_step_discovery_confirm() {user_input}")
             _LOGGER.error(f"discovered_device {self._discovered_device}")
             user_input['host'] = self._discovered_device.host
-            info = await validate_input(self.hass, user_input)
+            info = await self._async_validate_input(user_input)
             return self.async_create_entry(title=info["title"], data=user_input)
             # TODO FIX FIX FIX
             #self._discovered_device.password = user_input.get("password")
@@ -152,9 +163,13 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             # )
             if not (host := user_input[CONF_HOST]):
                 return await self.async_step_pick_device()
+            if "/" in host:
+                # A network in CIDR notation, probe it for devices to pick from
+                self._discovered_devices = await async_sweep_devices(self.hass, [host])
+                return await self.async_step_pick_device()
 
             try:
-                info = await validate_input(self.hass, user_input)
+                info = await self._async_validate_input(user_input)
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except InvalidAuth:
@@ -182,7 +197,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             _LOGGER.error(f"user-Input: {user_input}")
             _LOGGER.error(f"discovered devices: {self._discovered_devices[user_input['device']].__dict__}")
             user_input['host'] = self._discovered_devices[user_input['device']].host
-            info = await validate_input(self.hass, user_input)
+            info = await self._async_validate_input(user_input)
             return self.async_create_entry(title=info["title"], data=user_input)
 
 
@@ -190,7 +205,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             entry.unique_id for entry in self._async_current_entries()
         }
         _LOGGER.error(f"Configured Devices: {self._async_current_entries()}")
-        self._discovered_devices = await async_discover_devices(self.hass)
+        if not self._discovered_devices:
+            self._discovered_devices = await async_discover_devices(self.hass)
+        if not self._discovered_devices:
+            # Multicast may be filtered, e.g. across VLANs, fall back to probing
+            self._discovered_devices = await async_sweep_devices(self.hass)
         _LOGGER.error(f"Discovered Devices: {self._discovered_devices}")
         devices_name = {
             mac: f"{device.friendly_name} ({device.host})"
@@ -206,6 +225,24 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         vol.Required("password"): str}),
         )
 
+    async def _async_validate_input(self, user_input: dict[str, Any]) -> dict[str, Any]:
+        """Validate the input, remembering the device it caches."""
+        info = await validate_input(self.hass, user_input)
+        self._validated_host = user_input[CONF_HOST]
+        return info
+
+    @callback
+    def async_create_entry(self, **kwargs: Any) -> FlowResult:
+        """Create the entry, whose setup adopts the cached device."""
+        self._validated_host = None
+        return super().async_create_entry(**kwargs)
+
+    @callback
+    def async_remove(self) -> None:
+        """Drop the cached device when the flow ends without an entry."""
+        if self._validated_host is not None:
+            get_device_cache().discard(self._validated_host)
+
     @callback
     def _async_create_entry_from_device(self, device: SwidgetDiscoveredDevice) -> FlowResult:
         """Create a config entry from a smart device."""
@@ -217,6 +254,32 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             },
         )
 
+class SwidgetOptionsFlow(config_entries.OptionsFlow):
+    """Handle the options of a Swidget entry."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_TELEMETRY,
+                        default=self._entry.options.get(CONF_TELEMETRY, DEFAULT_TELEMETRY),
+                    ): bool,
+                }
+            ),
+        )
+
+
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
 
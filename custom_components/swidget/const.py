@@ -5,4 +5,21 @@ from typing import Final
 from homeassistant.const import Platform
 
 DOMAIN = "swidget"
-PLATFORMS: Final = [Platform.BUTTON, Platform.LIGHT, Platform.SENSOR, Platform.SWITCH, Platform.BINARY_SENSOR]
+# The SSDP discovery service lives beside the per-entry coordinators in hass.data[DOMAIN]
+DATA_DISCOVERY = f"{DOMAIN}_discovery"
+DATA_DISCOVERY_INDEX = f"{DOMAIN}_discovery_index"
+DATA_STARTUP = f"{DOMAIN}_startup"
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+DATA_PLATFORMS = f"{DOMAIN}_platforms"
+# Entry option keeping a history of the sensor values for statistics attributes
+CONF_TELEMETRY = "telemetry"
+DEFAULT_TELEMETRY = True
+# Every platform a device can need, each entry only forwards to the ones its device needs
+PLATFORMS: Final = [
+    Platform.BUTTON,
+    Platform.LIGHT,
+    Platform.SENSOR,
+    Platform.SWITCH,
+    Platform.BINARY_SENSOR,
+    Platform.CAMERA,
+]
@@ -1,23 +1,89 @@
 """Component to embed TP-Link smart home devices."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable, Iterable
 from datetime import timedelta
 import logging
+from typing import Any
+
+import aiohttp
 
 from .swidgetclient.device import SwidgetDevice
 from .swidgetclient.exceptions import SwidgetException
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 _LOGGER = logging.getLogger(__name__)
 
 REQUEST_REFRESH_DELAY = 0.35
+# Websocket devices push their state, polling is only a safety net
+PUSH_SAFETY_INTERVAL = timedelta(minutes=10)
+POLL_INTERVAL = timedelta(seconds=30)
+# A poll that hangs must not keep the coordinator busy for aiohttp's 5 minutes
+POLL_TIMEOUT = 10
+
+
+class SwidgetSubscriptionRegistry:
+    """Index listeners by the (assembly, component, function) paths they depend on."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._by_path: dict[tuple[str, str, str], set[CALLBACK_TYPE]] = {}
+        # Listeners that did not declare their paths hear about everything
+        self._wildcard: set[CALLBACK_TYPE] = set()
+        self._count = 0
+        self.notified = 0
+        self.suppressed = 0
+
+    @callback
+    def async_add(
+        self, update_callback: CALLBACK_TYPE, paths: Iterable[tuple[str, str, str]] | None
+    ) -> CALLBACK_TYPE:
+        """Subscribe a listener to some paths, or to all of them with None."""
+        paths = None if paths is None else frozenset(paths)
+        if paths is None:
+            self._wildcard.add(update_callback)
+        else:
+            for path in paths:
+                self._by_path.setdefault(path, set()).add(update_callback)
+        self._count += 1
+
+        @callback
+        def _remove() -> None:
+            self._count -= 1
+            if paths is None:
+                self._wildcard.discard(update_callback)
+                return
+            for path in paths:
+                listeners = self._by_path[path]
+                listeners.discard(update_callback)
+                if not listeners:
+                    del self._by_path[path]
+
+        return _remove
+
+    @callback
+    def async_listeners_for(self, changed: Iterable[tuple[str, str, str]]) -> set[CALLBACK_TYPE]:
+        """Return the listeners to wake for a set of changed paths."""
+        woken = set(self._wildcard)
+        for path in changed:
+            if (listeners := self._by_path.get(path)) is not None:
+                woken |= listeners
+        self.notified += len(woken)
+        self.suppressed += self._count - len(woken)
+        return woken
 
 
-class SwidgetDataUpdateCoordinator(DataUpdateCoordinator):
-    """DataUpdateCoordinator to gather data for a specific Swidget device."""
+class SwidgetDataUpdateCoordinator(DataUpdateCoordinator[set]):
+    """DataUpdateCoordinator to gather data for a specific Swidget device.
+
+    The data is the set of (assembly, component, function) paths changed by
+    the last update. Every state the device applies is pushed here as it
+    arrives; the update interval only matters when nothing is pushed.
+    """
 
     def __init__(
         self,
@@ -26,7 +92,7 @@ class SwidgetDataUpdateCoordinator(DataUpdateCoordinator):
     ) -> None:
         """Initialize DataUpdateCoordinator to gather data for specific device"""
         self.device = device
-        update_interval = timedelta(seconds=0.5)
+        update_interval = PUSH_SAFETY_INTERVAL if device.use_websockets else POLL_INTERVAL
         super().__init__(
             hass,
             _LOGGER,
@@ -38,6 +104,45 @@ class SwidgetDataUpdateCoordinator(DataUpdateCoordinator):
                 hass, _LOGGER, cooldown=REQUEST_REFRESH_DELAY, immediate=False
             ),
         )
+        self.subscriptions = SwidgetSubscriptionRegistry()
+        self._last_notified_success: bool | None = None
+        self._remove_state_listener = device.add_state_listener(self._async_handle_state)
+
+    @callback
+    def _async_handle_state(self, changed: set) -> None:
+        """Forward state changes applied by the device to the entities, also while polling."""
+        self.async_set_updated_data(changed)
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE, context: Any = None
+    ) -> Callable[[], None]:
+        """Listen for updates, only waking up for the paths given as context."""
+        remove_listener = super().async_add_listener(update_callback, context)
+        unsubscribe = self.subscriptions.async_add(update_callback, context)
+
+        @callback
+        def _remove() -> None:
+            unsubscribe()
+            remove_listener()
+
+        return _remove
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Wake only the listeners subscribed to the paths that changed."""
+        if self.data is None or self.last_update_success != self._last_notified_success:
+            # Availability changed or nothing is known yet, everyone has to look
+            self._last_notified_success = self.last_update_success
+            super().async_update_listeners()
+            return
+        for update_callback in self.subscriptions.async_listeners_for(self.data):
+            update_callback()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop receiving pushed state from the device."""
+        self._remove_state_listener()
 
     async def async_request_refresh_without_children(self) -> None:
         """Request a refresh without the children."""
@@ -46,6 +151,15 @@ class SwidgetDataUpdateCoordinator(DataUpdateCoordinator):
         # when we do not need it.
         await self.async_request_refresh()
 
-    async def _async_update_data(self) -> None:
-        """Fetch all device and sensor data from api."""
-        return
+    async def _async_update_data(self) -> set:
+        """Poll the device state over HTTP.
+
+        The changes the poll applies already reached the entities through the
+        state listener, like pushed ones, so there is nothing left to report.
+        """
+        try:
+            async with asyncio.timeout(POLL_TIMEOUT):
+                await self.device.get_state()
+        except (SwidgetException, aiohttp.ClientError, asyncio.TimeoutError, ValueError) as ex:
+            raise UpdateFailed(f"Unable to poll {self.device.ip_address}: {ex}") from ex
+        return set()
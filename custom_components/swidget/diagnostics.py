@@ -6,7 +6,7 @@ from typing import Any
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
-from .const import DOMAIN
+from .const import DATA_DISCOVERY_INDEX, DATA_SCHEDULER, DATA_STARTUP, DOMAIN
 from .coordinator import SwidgetDataUpdateCoordinator
 
 
@@ -15,4 +15,25 @@ async def async_get_config_entry_diagnostics(
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
     coordinator: SwidgetDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
-    return {"device_last_response": coordinator.device.hw_info}
\ No newline at end of file
+    device = coordinator.device
+    diagnostics = {
+        "device_last_response": device.hw_info,
+        "command_stats": device.command_stats,
+        "listener_stats": {
+            "notified": coordinator.subscriptions.notified,
+            "suppressed": coordinator.subscriptions.suppressed,
+        },
+    }
+    if (startup := hass.data.get(DATA_STARTUP)) is not None:
+        diagnostics["startup"] = startup.as_dict(entry.entry_id)
+    if (scheduler := hass.data.get(DATA_SCHEDULER)) is not None:
+        diagnostics["setup_scheduler"] = scheduler.as_dict()
+    if (index := hass.data.get(DATA_DISCOVERY_INDEX)) is not None:
+        diagnostics["discovery"] = {
+            "known_devices": len(index),
+            "flows_started": index.started,
+            "flows_avoided": index.avoided,
+        }
+    if device.use_websockets:
+        diagnostics["websocket"] = device._websocket.reconnect_stats
+    return diagnostics
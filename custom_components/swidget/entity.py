@@ -1,7 +1,7 @@
 """Common code for tplink."""
 from __future__ import annotations
 
-from collections.abc import Awaitable, Callable, Coroutine
+from collections.abc import Awaitable, Callable, Coroutine, Iterable
 from typing import Any, TypeVar
 
 from .swidgetclient.device import SwidgetDevice
@@ -25,6 +25,9 @@ def async_refresh_after(
 
     async def _async_wrap(self: _T, *args: _P.args, **kwargs: _P.kwargs) -> None:
         await func(self, *args, **kwargs)
+        if await self.device.wait_for_commands():
+            # The reply was applied, which already pushed it to the coordinator
+            return
         await self.coordinator.async_request_refresh_without_children()
 
     return _async_wrap
@@ -34,10 +37,17 @@ class CoordinatedSwidgetEntity(CoordinatorEntity[SwidgetDataUpdateCoordinator]):
     """Common base class for all coordinated tplink entities."""
 
     def __init__(
-        self, device: SwidgetDevice, coordinator: SwidgetDataUpdateCoordinator
+        self,
+        device: SwidgetDevice,
+        coordinator: SwidgetDataUpdateCoordinator,
+        paths: Iterable[tuple[str, str, str]] | None = None,
     ) -> None:
-        """Initialize the switch."""
-        super().__init__(coordinator)
+        """Initialize the switch.
+
+        paths lists the (assembly, component, function) paths the entity
+        renders, so the coordinator only wakes it when one of them changes.
+        """
+        super().__init__(coordinator, None if paths is None else frozenset(paths))
         self.device: SwidgetDevice = device
         self._attr_name = self.device.mac_address.replace(":", "").upper()
         self._attr_unique_id = self.device.id
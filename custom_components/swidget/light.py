@@ -66,7 +66,11 @@ class SwidgetSmartDimmer(CoordinatedSwidgetEntity, LightEntity):
         coordinator: SwidgetDataUpdateCoordinator,
     ) -> None:
         """Initialize the switch."""
-        super().__init__(device, coordinator)
+        super().__init__(
+            device,
+            coordinator,
+            [("host", "0", "toggle"), ("host", "0", "level")],
+        )
         # For backwards compat with pyHS100
         self._attr_name = "Dimmer"
         self._attr_unique_id = (
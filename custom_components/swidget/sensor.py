@@ -2,12 +2,13 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass
-from typing import cast
+from typing import Any, cast
 
 from .swidgetclient.device import SwidgetDevice
+from .swidgetclient.telemetry import ROLLUP_RESOLUTIONS
 
-from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
@@ -15,6 +16,7 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    UnitOfEnergy,
     UnitOfPower,
     UnitOfTemperature,
     UnitOfPressure,
@@ -35,6 +37,7 @@ from .coordinator import SwidgetDataUpdateCoordinator
 from .entity import CoordinatedSwidgetEntity
 
 _LOGGER = logging.getLogger(__name__)
+STATISTIC_VALUES = ("min", "max", "mean")
 
 
 @dataclass
@@ -63,6 +66,33 @@ SWIDGET_SENSORS: tuple[SwidgetSensorEntityDescription, ...] = (
         emeter_attr="power_1",
         precision=1,
     ),
+    SwidgetSensorEntityDescription(
+        key="Energy 0",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        name="Plug 0 Energy",
+        emeter_attr="energy_0",
+        precision=3,
+    ),
+    SwidgetSensorEntityDescription(
+        key="Energy 1",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        name="Plug 1 Energy",
+        emeter_attr="energy_1",
+        precision=3,
+    ),
+    SwidgetSensorEntityDescription(
+        key="Energy Total",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        name="Total Energy",
+        emeter_attr="energy_total",
+        precision=3,
+    ),
     SwidgetSensorEntityDescription(
         key="Temperature",
         native_unit_of_measurement=UnitOfTemperature.CELSIUS,
@@ -153,7 +183,9 @@ async def async_setup_entry(
 
     def _async_sensors_for_device(device: SwidgetDevice) -> list[SwidgetSensor]:
         return [
-            SwidgetSensor(device, coordinator, description)
+            (SwidgetEnergySensor if description.device_class == SensorDeviceClass.ENERGY else SwidgetSensor)(
+                device, coordinator, description
+            )
             for description in SWIDGET_SENSORS
             if async_emeter_from_device(device, description) is not None
         ]
@@ -167,6 +199,12 @@ class SwidgetSensor(CoordinatedSwidgetEntity, SensorEntity):
     """Representation of a Swidget sensor"""
 
     entity_description: SwidgetSensorEntityDescription
+    # The history is served from memory, keep it out of the recorder
+    _unrecorded_attributes = frozenset(
+        f"{name}_{resolution}"
+        for name in STATISTIC_VALUES
+        for resolution in ROLLUP_RESOLUTIONS
+    )
 
     def __init__(
         self,
@@ -175,7 +213,7 @@ class SwidgetSensor(CoordinatedSwidgetEntity, SensorEntity):
         description: SwidgetSensorEntityDescription,
     ) -> None:
         """Initialize the switch."""
-        super().__init__(device, coordinator)
+        super().__init__(device, coordinator, device.value_paths(description.emeter_attr))
         self.entity_description = description
         self._attr_unique_id = (
             f"{self.device}_{self.entity_description.key}"
@@ -193,3 +231,36 @@ class SwidgetSensor(CoordinatedSwidgetEntity, SensorEntity):
     def native_value(self) -> float | None:
         """Return the sensors state."""
         return async_emeter_from_device(self.device, self.entity_description)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the min/max/mean of the current rollup buckets, once there are samples."""
+        telemetry = self.device.telemetry
+        if telemetry is None:
+            return None
+        statistics = telemetry.statistics(self.entity_description.emeter_attr)
+        if statistics is None:
+            return None
+        attributes = {}
+        for resolution, bucket in statistics.items():
+            if bucket is None:
+                continue
+            for name in STATISTIC_VALUES:
+                attributes[f"{name}_{resolution}"] = round(
+                    bucket[name], self.entity_description.precision or 0
+                )
+        return attributes or None
+
+
+class SwidgetEnergySensor(SwidgetSensor, RestoreSensor):
+    """Representation of a Swidget energy counter that survives restarts"""
+
+    async def async_added_to_hass(self) -> None:
+        """Continue the energy meter from the last saved total."""
+        await super().async_added_to_hass()
+        if (last := await self.async_get_last_sensor_data()) is None:
+            return
+        if last.native_value is None:
+            return
+        meter = self.entity_description.emeter_attr[len("energy_"):]
+        self.device.restore_energy(meter, float(last.native_value))
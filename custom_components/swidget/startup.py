@@ -0,0 +1,107 @@
+"""Startup timing and pacing for the Swidget integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import time
+from typing import Any
+
+# Devices are microcontrollers, a handful of TLS handshakes at a time is plenty
+DEFAULT_SETUP_CONCURRENCY = 4
+DEFAULT_SETUP_SPACING = 0.25
+
+
+class SwidgetStartupTimings:
+    """How long each phase of bringing up the integration and its entries took.
+
+    All durations are in seconds, measured with the monotonic clock.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty timings."""
+        self.setup: float | None = None
+        self.discovery_start: float | None = None
+        self.entries: dict[str, dict[str, Any]] = {}
+
+    def start_entry(self, entry_id: str) -> float:
+        """Begin timing the setup of an entry and return its start time."""
+        self.entries[entry_id] = {}
+        return time.monotonic()
+
+    def record(self, entry_id: str, phase: str, start: float) -> None:
+        """Record the time since start as a phase of an entry."""
+        if (timings := self.entries.get(entry_id)) is not None:
+            timings[phase] = round(time.monotonic() - start, 3)
+
+    def as_dict(self, entry_id: str | None = None) -> dict[str, Any]:
+        """Return the integration timings, and those of one entry if given."""
+        timings: dict[str, Any] = {
+            "setup": self.setup,
+            "discovery_start": self.discovery_start,
+        }
+        if entry_id is not None:
+            timings["entry"] = self.entries.get(entry_id)
+        return timings
+
+
+class SwidgetSetupScheduler:
+    """Pace the handshakes and initial syncs of all entries.
+
+    At most concurrency devices are being set up at once, and consecutive
+    starts are at least spacing seconds apart. Everybody else waits for a
+    slot and goes as soon as one frees up.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_SETUP_CONCURRENCY,
+        spacing: float = DEFAULT_SETUP_SPACING,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.concurrency = concurrency
+        self.spacing = spacing
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._spacing_lock = asyncio.Lock()
+        self._next_start = 0.0
+        self.active = 0
+        self.waiting = 0
+        self.peak_active = 0
+        self.time_to_ready: dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the setup slots for the duration of the block."""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            async with self._spacing_lock:
+                if (delay := self._next_start - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                self._next_start = time.monotonic() + self.spacing
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            try:
+                yield
+            finally:
+                self.active -= 1
+        finally:
+            self._semaphore.release()
+
+    def ready(self, host: str, start: float) -> None:
+        """Record how long a device took from the start of its setup to its first state."""
+        self.time_to_ready[host] = round(time.monotonic() - start, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the settings, the current load and the time to ready per device."""
+        return {
+            "concurrency": self.concurrency,
+            "spacing": self.spacing,
+            "active": self.active,
+            "waiting": self.waiting,
+            "peak_active": self.peak_active,
+            "time_to_ready": self.time_to_ready,
+        }
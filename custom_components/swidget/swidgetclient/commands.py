@@ -0,0 +1,371 @@
+import asyncio
+from collections import OrderedDict
+import itertools
+import logging
+import time
+
+from .exceptions import SwidgetCommandTimeout
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_COMMAND_TIMEOUT = 10
+DEFAULT_OUTBOX_SIZE = 32
+DEFAULT_OUTBOX_TTL = 60
+# Request id used by firmware that does not echo the id it was sent
+GENERIC_COMMAND_ID = "command"
+
+
+def _consume_exception(future: asyncio.Future):
+    """Mark a failed acknowledgement as retrieved for callers that never await it"""
+    if not future.cancelled():
+        future.exception()
+
+
+def payload_paths(payload: dict) -> tuple:
+    """Return the sorted (assembly, component, function) paths a command payload touches"""
+    return tuple(sorted(
+        (assembly, component, function)
+        for assembly, data in payload.items()
+        for component, functions in data["components"].items()
+        for function in functions
+    ))
+
+
+def merge_payload(payload: dict, newer: dict) -> dict:
+    """Return a copy of a command payload with a newer one merged in, newer values winning"""
+    merged = {}
+    for source in (payload, newer):
+        for assembly, data in source.items():
+            components = merged.setdefault(assembly, {"components": {}})["components"]
+            for component, functions in data["components"].items():
+                for function, command in functions.items():
+                    components.setdefault(component, {}).setdefault(function, {}).update(command)
+    return merged
+
+
+def chain_future(source: asyncio.Future, targets: list):
+    """Copy the outcome of one future onto others once it completes"""
+
+    def _copy(done: asyncio.Future):
+        for target in targets:
+            if target.done():
+                continue
+            if done.cancelled():
+                target.cancel()
+            elif done.exception() is not None:
+                target.set_exception(done.exception())
+            else:
+                target.set_result(done.result())
+
+    source.add_done_callback(_copy)
+
+
+class SwidgetCommandTracker:
+    """Correlate websocket commands with the replies that acknowledge them"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        # request_id -> (future, time sent, timeout handle), in send order
+        self._pending = {}
+        self.sent = 0
+        self.acked = 0
+        self.timed_out = 0
+        self.late = 0
+        self.last_latency = None
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    def __contains__(self, request_id) -> bool:
+        return request_id in self._pending
+
+    @staticmethod
+    def is_command_id(request_id) -> bool:
+        """Return True for the request id of a command reply, pending or not"""
+        return request_id == GENERIC_COMMAND_ID or (
+            isinstance(request_id, str) and request_id.startswith(f"{GENERIC_COMMAND_ID}-"))
+
+    def next_id(self) -> str:
+        """Return a request id that is unique for this device"""
+        return f"{GENERIC_COMMAND_ID}-{next(self._ids)}"
+
+    def track(self, request_id: str, timeout: float = DEFAULT_COMMAND_TIMEOUT) -> asyncio.Future:
+        """Start waiting for the reply to a command
+
+        :return: A future resolved with the reply, or failed with SwidgetCommandTimeout
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.add_done_callback(_consume_exception)
+        handle = loop.call_later(timeout, self._expire, request_id, timeout)
+        self._pending[request_id] = (future, time.monotonic(), handle)
+        self.sent += 1
+        return future
+
+    def resolve(self, request_id: str, message: dict) -> bool:
+        """Resolve the command a reply belongs to
+
+        Replies carrying the generic id acknowledge the oldest pending command.
+        Replies arriving after their command timed out are only counted.
+        """
+        if request_id == GENERIC_COMMAND_ID and request_id not in self._pending:
+            request_id = next(iter(self._pending), None)
+        entry = self._pending.pop(request_id, None)
+        if entry is None:
+            self.late += 1
+            return False
+        future, sent_at, handle = entry
+        handle.cancel()
+        latency = time.monotonic() - sent_at
+        self.acked += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self._total_latency += latency
+        if not future.done():
+            future.set_result(message)
+        return True
+
+    def discard(self, request_id: str):
+        """Forget a command that never made it onto the wire"""
+        entry = self._pending.pop(request_id, None)
+        if entry is not None:
+            future, _, handle = entry
+            handle.cancel()
+            future.cancel()
+
+    def in_flight(self) -> list:
+        """Return the futures of every command still waiting for a reply"""
+        return [future for future, _, _ in self._pending.values()]
+
+    def _expire(self, request_id: str, timeout: float):
+        entry = self._pending.pop(request_id, None)
+        if entry is None:
+            return
+        future = entry[0]
+        self.timed_out += 1
+        _LOGGER.warning(f"Command {request_id} was not acknowledged within {timeout}s")
+        if not future.done():
+            future.set_exception(SwidgetCommandTimeout(f"No reply to {request_id} after {timeout}s"))
+
+    @property
+    def stats(self) -> dict:
+        """Return command counters and acknowledgement latencies in seconds"""
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "timed_out": self.timed_out,
+            "late": self.late,
+            "pending": len(self._pending),
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "mean_latency": self._total_latency / self.acked if self.acked else None,
+        }
+
+
+class SwidgetOutbox:
+    """Hold commands while the websocket is down so they can be replayed
+
+    Commands are keyed by the functions they touch and a newer command is
+    merged into a queued one for the same functions, newer values winning. Queued commands expire
+    after ``ttl`` seconds and the oldest is dropped when the outbox is full.
+    """
+
+    def __init__(self, maxlen: int = DEFAULT_OUTBOX_SIZE, ttl: float = DEFAULT_OUTBOX_TTL):
+        self.maxlen = maxlen
+        self.ttl = ttl
+        # paths -> (payload, command timeout, futures, expiry handle), oldest first
+        self._queue = OrderedDict()
+        self.queued = 0
+        self.replayed = 0
+        self.superseded = 0
+        self.expired = 0
+        self.overflowed = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, payload: dict, timeout: float) -> asyncio.Future:
+        """Queue a command payload
+
+        :return: A future that follows the acknowledgement of the replayed command
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.add_done_callback(_consume_exception)
+        key = payload_paths(payload)
+        futures = [future]
+        if (previous := self._queue.pop(key, None)) is not None:
+            previous[3].cancel()
+            payload = merge_payload(previous[0], payload)
+            futures = previous[2] + futures
+            self.superseded += 1
+        elif len(self._queue) >= self.maxlen:
+            _, (_, _, dropped, handle) = self._queue.popitem(last=False)
+            handle.cancel()
+            self.overflowed += 1
+            self._fail(dropped, "Outbox full, command dropped")
+        handle = loop.call_later(self.ttl, self._expire, key)
+        self._queue[key] = (payload, timeout, futures, handle)
+        self.queued += 1
+        return future
+
+    def drain(self) -> list:
+        """Remove and return every queued (payload, timeout, futures) in order"""
+        entries = []
+        while self._queue:
+            _, (payload, timeout, futures, handle) = self._queue.popitem(last=False)
+            handle.cancel()
+            entries.append((payload, timeout, futures))
+        self.replayed += len(entries)
+        return entries
+
+    def _expire(self, key):
+        entry = self._queue.pop(key, None)
+        if entry is not None:
+            self.expired += 1
+            self._fail(entry[2], f"Command expired after {self.ttl}s offline")
+
+    @staticmethod
+    def _fail(futures: list, reason: str):
+        _LOGGER.warning(reason)
+        for future in futures:
+            if not future.done():
+                future.set_exception(SwidgetCommandTimeout(reason))
+
+    @property
+    def stats(self) -> dict:
+        """Return the outbox depth and how many commands were replayed or dropped"""
+        return {
+            "outbox_depth": len(self._queue),
+            "outbox_queued": self.queued,
+            "outbox_replayed": self.replayed,
+            "outbox_superseded": self.superseded,
+            "outbox_expired": self.expired,
+            "outbox_overflowed": self.overflowed,
+        }
+
+
+class SwidgetCommandCoalescer:
+    """Collapse bursts of commands for one function into the latest value
+
+    At most one command per (assembly, component, function) is in flight.
+    Commands submitted meanwhile are merged into a single follow-up, later
+    keys winning, so superseded values that were never sent are dropped.
+    """
+
+    def __init__(self, send):
+        # Coroutine function (assembly, component, function, command) -> ack future
+        self._send = send
+        self._in_flight = {}
+        self._pending = {}
+        self._waiting = set()
+        self.submitted = 0
+        self.sent = 0
+        self.collapsed = 0
+
+    def submit(self, assembly: str, component: str, function: str, command: dict) -> asyncio.Future:
+        """Queue a command, returning a future resolved with the reply that covers it"""
+        key = (assembly, component, function)
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        future.add_done_callback(self._waiting.discard)
+        self._waiting.add(future)
+        self.submitted += 1
+        if key not in self._in_flight:
+            self._in_flight[key] = asyncio.ensure_future(self._run(key, dict(command), [future]))
+        elif key not in self._pending:
+            self._pending[key] = (dict(command), [future])
+        else:
+            pending_command, futures = self._pending[key]
+            pending_command.update(command)
+            futures.append(future)
+            self.collapsed += 1
+        return future
+
+    async def _run(self, key, command, futures):
+        """Send the command for a key, then whatever piled up behind it"""
+        try:
+            while True:
+                self.sent += 1
+                try:
+                    ack = await self._send(*key, command)
+                    result = await ack
+                except asyncio.CancelledError:
+                    for future in futures:
+                        future.cancel()
+                    # Only a cancelled ack is survived, a cancelled run stops here
+                    if asyncio.current_task().cancelling():
+                        raise
+                except Exception as error:  # pylint: disable=broad-except
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(error)
+                else:
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(result)
+                if (pending := self._pending.pop(key, None)) is None:
+                    break
+                command, futures = pending
+        finally:
+            del self._in_flight[key]
+            # A follow-up left behind would otherwise go out after newer commands
+            if (pending := self._pending.pop(key, None)) is not None:
+                for future in pending[1]:
+                    future.cancel()
+
+    def waiting(self) -> list:
+        """Return the futures of every submitted command not yet acknowledged"""
+        return list(self._waiting)
+
+    @property
+    def stats(self) -> dict:
+        """Return how many commands were submitted, sent and collapsed"""
+        return {
+            "coalesce_submitted": self.submitted,
+            "coalesce_sent": self.sent,
+            "collapsed": self.collapsed,
+        }
+
+
+class SwidgetCommandBatch:
+    """Collect commands and send them to a device as a single message
+
+    The reply is applied in one state pass. Use it directly or as an async
+    context manager, which sends the batch on a clean exit::
+
+        async with device.batch() as batch:
+            batch.add("host", "0", "level", {"now": 40, "default": 60})
+            batch.add("insert", "usb", "toggle", {"state": "on"})
+        await batch.ack
+    """
+
+    def __init__(self, device, timeout: float = DEFAULT_COMMAND_TIMEOUT):
+        self._device = device
+        self._timeout = timeout
+        self.payload = {}
+        self.ack = None
+
+    def __len__(self) -> int:
+        return sum(
+            len(functions)
+            for assembly in self.payload.values()
+            for functions in assembly["components"].values()
+        )
+
+    def add(self, assembly: str, component: str, function: str, command: dict) -> "SwidgetCommandBatch":
+        """Add a command, merging it with earlier ones for the same function"""
+        components = self.payload.setdefault(assembly, {"components": {}})["components"]
+        components.setdefault(component, {}).setdefault(function, {}).update(command)
+        return self
+
+    async def send(self) -> asyncio.Future:
+        """Send every collected command in one message"""
+        self.ack = await self._device.send_payload(self.payload, self._timeout)
+        return self.ack
+
+    async def __aenter__(self) -> "SwidgetCommandBatch":
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if exc_type is None and self.payload:
+            await self.send()
@@ -1,16 +1,35 @@
+import asyncio
 import json
 import logging
+import sys
 import time
 
-from aiohttp import ClientSession, TCPConnector
 from enum import auto, Enum
-from typing import Any, Dict, List
-
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .commands import (
+    DEFAULT_COMMAND_TIMEOUT,
+    SwidgetCommandBatch,
+    SwidgetCommandCoalescer,
+    SwidgetCommandTracker,
+    SwidgetOutbox,
+    chain_future,
+)
+from .energy import DEFAULT_METER_INTERVAL, SwidgetEnergyMeter
 from .exceptions import SwidgetException
+from .pool import SwidgetConnectionPool, get_connection_pool
+from .telemetry import TELEMETRY_FUNCTIONS, SwidgetTelemetry
+from .trace import TRACE_ALL, TRACE_COMMANDS, TRACE_OFF, TRACE_STATE, SwidgetTracer
 from .websocket import SwidgetWebsocket
 
 _LOGGER = logging.getLogger(__name__)
 
+# Changed-path reported by process_state when the signal strength moves
+RSSI_PATH = ("connection", "", "rssi")
+# Energy meters are not part of the device state, their totals live under their own assembly
+ENERGY_ASSEMBLY = "energy"
+_MISSING = object()
+
 
 class DeviceType(Enum):
     """Device type enum."""
@@ -24,42 +43,135 @@ class DeviceType(Enum):
 
 
 class SwidgetDevice:
-    def __init__(self, host, secret_key, ssl=False, use_websockets=True):
+    def __init__(self, host, secret_key, ssl=False, use_websockets=True,
+                 pool: SwidgetConnectionPool = None, telemetry: bool = True):
         self.ip_address = host
         self.ssl = ssl
         self.secret_key = secret_key
         self.use_websockets = use_websockets
         self._friendly_name = "Unknown Swidget Device"
-        headers = {"x-secret-key": self.secret_key}
-        connector = TCPConnector(force_close=True)
-        self._session = ClientSession(headers=headers, connector=connector)
+        # Devices share one keep-alive pool, so the secret key travels per request
+        self._headers = {"x-secret-key": self.secret_key}
+        self._pool = pool or get_connection_pool()
         self._last_update = None
+        self.rssi = None
+        self._summary_known = False
+        self._name_known = False
+        self.update_timings: Dict[str, float] = {}
+        self._commands = SwidgetCommandTracker()
+        self._coalescer = SwidgetCommandCoalescer(self.send_command)
+        self._outbox = SwidgetOutbox()
+        self._tracer = SwidgetTracer(self.ip_address)
+        # None when the sensor history is not wanted, which saves recording it
+        self.telemetry = SwidgetTelemetry() if telemetry else None
+        # Energy meters per metered host component, plus "total" for the device
+        self.energy: Dict[str, SwidgetEnergyMeter] = {}
+        self._metered_at = None
+        self._state_listeners = []
+        self._sync_waiters: List[asyncio.Future] = []
+        # Bumped whenever applied state changes, so derived values can be cached
+        self.state_version = 0
+        self._realtime_values = None
+        self._realtime_values_version = -1
         if self.use_websockets:
             self._websocket = SwidgetWebsocket(
                 host=self.ip_address,
                 secret_key=self.secret_key,
                 callback=self.message_callback,
-                session=self._session)
+                pool=self._pool,
+                on_connect=self.flush_outbox,
+                tracer=self._tracer)
+
 
+    def specialize(self, device_class):
+        """Return this device as an instance of a typed subclass
+
+        The summary, name and session that were already obtained are carried
+        over, so none of the requests are made again.
+        """
+        device = device_class.__new__(device_class)
+        device.__dict__.update(self.__dict__)
+        # Both hold bound methods of the untyped device, which must not be called any more
+        device._coalescer = SwidgetCommandCoalescer(device.send_command)
+        if device.use_websockets:
+            device._websocket.callback = device.message_callback
+            device._websocket.on_connect = device.flush_outbox
+        return device
+
+    def add_state_listener(self, listener: Callable[[Set[Tuple[str, str, str]]], None]) -> Callable[[], None]:
+        """Call a listener with the changed paths whenever applied state changes something
+
+        The listener runs synchronously in the event loop, for websocket
+        pushes as well as HTTP replies.
+
+        :return: A function that removes the listener again
+        """
+        self._state_listeners.append(listener)
+        return lambda: self._state_listeners.remove(listener)
+
+    def set_trace_level(self, level: int = TRACE_OFF, sample_rates: dict = None):
+        """Enable tracing of commands and state messages for this device
+
+        :param level: One of the TRACE_* levels, TRACE_OFF disables tracing
+        :param sample_rates: Trace one in N messages per message type
+        """
+        self._tracer.level = level
+        if sample_rates is not None:
+            self._tracer.sample_rates = sample_rates
+
+    @property
+    def _session(self):
+        """Return the pooled HTTP session."""
+        return self._pool.session
 
     async def stop(self):
         """Stop the websocket."""
-        if self._websocket is not None:
-            await self._websocket.stop()
+        if self.use_websockets:
+            await self._websocket.close()
 
     async def message_callback(self, message):
         """Entrypoint for a websocket callback"""
-        if message["request_id"] == "summary":
+        request_id = message["request_id"]
+        if request_id == "summary":
             await self.process_summary(message)
-        elif message["request_id"] == "state" or message["request_id"] == "DYNAMIC_UPDATE" or message["request_id"] == "command":
+        elif request_id == "state" or request_id == "DYNAMIC_UPDATE":
+            await self.process_state(message)
+            if request_id == "state":
+                self._resolve_sync_waiters()
+        elif self._commands.is_command_id(request_id):
+            # The state in a reply is applied even if its command already timed out
+            if self._tracer.level >= TRACE_COMMANDS:
+                self._tracer.trace("Reply to %s: %s", request_id, message)
             await self.process_state(message)
+            self._commands.resolve(request_id, message)
 
-    async def get_summary(self):
-        """Get a summary of the device over HTTP"""
+    async def wait_for_sync(self):
+        """Wait until the websocket delivers the full state it asks for on connecting"""
+        future = asyncio.get_running_loop().create_future()
+        self._sync_waiters.append(future)
+        try:
+            await future
+        finally:
+            if future in self._sync_waiters:
+                self._sync_waiters.remove(future)
+
+    def _resolve_sync_waiters(self):
+        waiters, self._sync_waiters = self._sync_waiters, []
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    async def _get_json(self, path: str):
+        """GET a JSON document from the device over HTTP"""
         async with self._session.get(
-            url=f"https://{self.ip_address}/api/v1/summary", ssl=self.ssl
+            url=f"https://{self.ip_address}/{path}", ssl=self.ssl,
+            headers=self._headers,
         ) as response:
-            summary = await response.json()
+            return await response.json()
+
+    async def get_summary(self):
+        """Get a summary of the device over HTTP"""
+        summary = await self._get_json("api/v1/summary")
         await self.process_summary(summary)
 
     async def process_summary(self, summary):
@@ -74,94 +186,284 @@ class SwidgetDevice:
         self.device_type = self.assemblies['host'].type
         self.insert_type = self.assemblies['insert'].type
         self.id = self.assemblies['host'].id
+        # Shortcuts for the components read by the on/off and USB properties
+        self._main_component = self.assemblies['host'].components.get("0")
+        self._usb_component = self.assemblies['insert'].components.get("usb")
+        self._summary_known = True
+        self.state_version += 1
         self._last_update = int(time.time())
 
-    async def get_state(self):
+    async def get_state(self) -> Set[Tuple[str, str, str]]:
         """ Get the state of the device over HTTP"""
-        async with self._session.get(
-            url=f"https://{self.ip_address}/api/v1/state", ssl=self.ssl
-        ) as response:
-            state = await response.json()
-        await self.process_state(state)
+        state = await self._get_json("api/v1/state")
+        return await self.process_state(state)
 
-    async def process_state(self, state):
-        """ Process any information about the state of the device or insert"""
-        _LOGGER.error(f"Processing state: {state}")
-        # State is not always in the state (during callback)
-        try:
-            self.rssi = state["connection"]["rssi"]
-        except:
-            pass
-        """
-        2022-06-28 14:53:13 ERROR (MainThread) [custom_components.swidget.swidgetclient.device] Self.assemblies: {'host': <custom_components.swidget.swidgetclient.device.SwidgetAssembly object at 0xffff862b6280>, 'insert': <custom_components.swidget.swidgetclient.device.SwidgetAssembly object at 0xffff8f0b5520>}
-        Processing state: {'request_id': 'command', 'insert': {'components': {'usb': {'toggle': {}, 'state': 'on'}}}}
+    async def process_state(self, state) -> Set[Tuple[str, str, str]]:
+        """ Process any information about the state of the device or insert
+
+        Only the assemblies, components and functions present in the message
+        are visited, e.g. {'insert': {'components': {'usb': {'toggle': {'state': 'on'}}}}}
+        touches a single function.
 
+        :return: The (assembly, component, function) paths whose value changed
         """
-        for assembly in self.assemblies:
-            _LOGGER.error(assembly)
-            for id, component in self.assemblies[assembly].components.items():
-                _LOGGER.error(f"id:{id}   component: {component.__dict__}")
-                _LOGGER.error(f"component.function: {component.functions}")
-                try:
-                    _LOGGER.error(f"Setting State: {state[assembly]['components'][id]}")
-                    component.functions.update(state[assembly]["components"][id])
-                except:
-                    pass
+        tracer = self._tracer
+        if tracer.level >= TRACE_STATE and tracer.sampled(state.get("request_id")):
+            tracer.trace("Processing state: %s", state)
+        changed = self._apply_state(state)
+        if changed and self.telemetry is not None:
+            self._record_telemetry(changed)
+        now = time.monotonic()
+        if (self._metered_at is None or now - self._metered_at >= DEFAULT_METER_INTERVAL
+                or any(path[2] == "power" for path in changed)):
+            changed |= self._meter_energy(now)
+        if changed:
+            self.state_version += 1
         self._last_update = int(time.time())
-        _LOGGER.error(f"Finished getting state: {self.__dict__}")
-        a = self.assemblies['host'].__dict__
-        b = self.assemblies['insert'].__dict__
-        _LOGGER.error(f"Finished getting state: {self.__dict__}")
-        _LOGGER.error(f"Finished getting state: {a}")
-        _LOGGER.error(f"Finished getting state: {b}")
-
-    async def get_friendly_name(self):
+        if tracer.level >= TRACE_ALL:
+            tracer.trace("Changed %s, assemblies: %s", changed, self.assemblies)
+        if changed:
+            for listener in self._state_listeners:
+                listener(changed)
+        return changed
+
+    def _apply_state(self, state) -> Set[Tuple[str, str, str]]:
+        """Apply a state message and return the paths that changed"""
+        changed = set()
+        # State is not always in the state (during callback)
+        connection = state.get("connection")
+        if connection is not None and "rssi" in connection and connection["rssi"] != self.rssi:
+            self.rssi = connection["rssi"]
+            changed.add(RSSI_PATH)
+        for assembly_id, assembly_state in state.items():
+            assembly = self.assemblies.get(assembly_id)
+            if assembly is None:
+                continue
+            for component_id, function_states in assembly_state.get("components", {}).items():
+                component = assembly.components.get(component_id)
+                if component is None:
+                    continue
+                for function, value in function_states.items():
+                    if component.apply(function, value):
+                        changed.add((assembly_id, component_id, function))
+        return changed
+
+    def _record_telemetry(self, changed: Set[Tuple[str, str, str]]):
+        """Add the changed numeric sensor values to the telemetry store"""
+        for assembly_id, component_id, function in changed:
+            value_name = TELEMETRY_FUNCTIONS.get(function)
+            if value_name is None:
+                continue
+            value = self.assemblies[assembly_id].components[component_id].functions[function]
+            # Insert components report bare values for some functions
+            if isinstance(value, SwidgetFunction):
+                value = value.get(value_name)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric = f"power_{component_id}" if function == "power" else function
+                self.telemetry.record(metric, value)
+
+    def _meter_energy(self, now: float) -> Set[Tuple[str, str, str]]:
+        """Integrate the current power readings into the energy meters
+
+        Runs when a power reading changed, and every DEFAULT_METER_INTERVAL
+        seconds of state messages otherwise, as an unchanged power is only
+        implied by the device still reporting.
+
+        :return: The energy paths of the meters that moved by a visible amount
+        """
+        self._metered_at = now
+        total = None
+        for component_id, component in self.assemblies['host'].components.items():
+            power = component.power
+            if not isinstance(power, SwidgetFunction) or power.current is None:
+                continue
+            meter = self.energy.get(component_id)
+            if meter is None:
+                meter = self.energy[component_id] = SwidgetEnergyMeter()
+            meter.hold(now)
+            meter.add(power.current, now)
+            total = power.current if total is None else total + power.current
+        if total is not None:
+            meter = self.energy.get("total")
+            if meter is None:
+                meter = self.energy["total"] = SwidgetEnergyMeter()
+            meter.hold(now)
+            meter.add(total, now)
+        return {(ENERGY_ASSEMBLY, meter_id, "kwh") for meter_id, meter in self.energy.items() if meter.publish()}
+
+    def restore_energy(self, meter: str, kwh: float):
+        """Add the kWh counted before a restart to a meter, "total" or a component id, once"""
+        if meter not in self.energy:
+            self.energy[meter] = SwidgetEnergyMeter()
+        if self.energy[meter].restore(kwh):
+            self.state_version += 1
+
+    async def _fetch_friendly_name(self):
+        """Fetch the name document, returning None if the device has no name"""
         try:
-            async with self._session.get(
-                url=f"https://{self.ip_address}/api/v1/name", ssl=self.ssl
-            ) as response:
-                name = await response.json()
+            return await self._get_json("api/v1/name")
         except Exception:
+            return None
+
+    async def get_friendly_name(self):
+        name = await self._fetch_friendly_name()
+        await self._apply_friendly_name(name)
+
+    async def _apply_friendly_name(self, name):
+        if name is None:
             name = {"name": f"Swidget {self.device_type} w/{self.insert_type} insert"}
         await self.process_friendly_name(name['name'])
 
     async def process_friendly_name(self, name):
         self._friendly_name = name
+        self._name_known = True
 
-    async def update(self):
+    async def _timed(self, phase: str, coro):
+        """Await a coroutine and record how long it took under the given phase"""
+        start = time.monotonic()
+        try:
+            return await coro
+        finally:
+            self.update_timings[phase] = time.monotonic() - start
+
+    async def update(self, concurrent: bool = False):
+        """Refresh the summary, state and friendly name of the device
+
+        By default the three requests are made one after another. In concurrent
+        mode they run side by side, and the summary and name are skipped when
+        they are already known, so a refresh costs a single round trip.
+        The duration of each phase is kept in ``update_timings``.
+        """
         if self._last_update is None:
             _LOGGER.debug("Performing the initial update to obtain sysinfo")
-        await self.get_summary()
-        await self.get_state()
-        await self.get_friendly_name()
+        self.update_timings = {}
+        start = time.monotonic()
+        if concurrent:
+            await self._update_concurrently()
+        else:
+            await self._timed("summary", self.get_summary())
+            await self._timed("state", self.get_state())
+            await self._timed("name", self.get_friendly_name())
+        self.update_timings["total"] = time.monotonic() - start
+        _LOGGER.debug(f"Updated {self.ip_address} in {self.update_timings}")
+
+    async def _update_concurrently(self):
+        """Fetch everything that is still unknown in parallel, then apply it in order"""
+        fetches = {"state": self._get_json("api/v1/state")}
+        if not self._summary_known:
+            fetches["summary"] = self._get_json("api/v1/summary")
+        if not self._name_known:
+            fetches["name"] = self._fetch_friendly_name()
+        results = await asyncio.gather(
+            *(self._timed(phase, fetch) for phase, fetch in fetches.items())
+        )
+        results = dict(zip(fetches, results))
+        # The state can only be applied once the assemblies exist
+        if "summary" in results:
+            await self.process_summary(results["summary"])
+        await self.process_state(results["state"])
+        if "name" in results:
+            await self._apply_friendly_name(results["name"])
 
     async def send_config(self, payload: dict):
         data = json.dumps({"type":"config","request_id":"abcd", "payload": payload})
         await self._websocket.send_str(data)
 
     async def send_command(
-        self, assembly: str, component: str, function: str, command: dict
-    ):
-        """Send a command to the Swidget device either using a HTTP call or the existing websocket"""
+        self, assembly: str, component: str, function: str, command: dict,
+        timeout: float = DEFAULT_COMMAND_TIMEOUT,
+    ) -> asyncio.Future:
+        """Send a command to the Swidget device either using a HTTP call or the existing websocket
+
+        Websocket commands carry a unique request id, so several can be in
+        flight at once. The returned future resolves with the device's reply
+        once it has been applied, or fails with SwidgetCommandTimeout.
+        HTTP commands return an already resolved future.
+        """
         data = {assembly: {"components": {component: {function: command}}}}
-
+        return await self.send_payload(data, timeout)
+
+    def batch(self, timeout: float = DEFAULT_COMMAND_TIMEOUT) -> SwidgetCommandBatch:
+        """Start a batch of commands that is sent as a single message"""
+        return SwidgetCommandBatch(self, timeout)
+
+    async def send_commands(
+        self, commands: Iterable[Tuple[str, str, str, dict]],
+        timeout: float = DEFAULT_COMMAND_TIMEOUT,
+    ) -> asyncio.Future:
+        """Send several (assembly, component, function, command) tuples as one message"""
+        batch = self.batch(timeout)
+        for assembly, component, function, command in commands:
+            batch.add(assembly, component, function, command)
+        return await batch.send()
+
+    async def send_payload(self, data: dict, timeout: float = DEFAULT_COMMAND_TIMEOUT) -> asyncio.Future:
+        """Send a command payload of one or more assemblies, components and functions"""
         if self.use_websockets:
-            data = json.dumps({"type": "command",
-                               "request_id": "command",
-                               "payload": data
-                               })
-            _LOGGER.error(f"About to send data: {data}")
-            await self._websocket.send_str(data)
-        else:
-            async with self._session.post(
-                url=f"https://{self.ip_address}/api/v1/command",
-                ssl=self.ssl,
-                data=json.dumps(data),
-            ) as response:
-                state = await response.json()
+            if not self._websocket.connected:
+                _LOGGER.debug(f"Websocket to {self.ip_address} is down, queueing command")
+                return self._outbox.put(data, timeout)
+            request_id = self._commands.next_id()
+            ack = self._commands.track(request_id, timeout)
+            message = json.dumps({"type": "command",
+                                  "request_id": request_id,
+                                  "payload": data
+                                  })
+            if self._tracer.level >= TRACE_COMMANDS:
+                self._tracer.trace("Sending command: %s", message)
+            try:
+                await self._websocket.send_str(message)
+            except Exception as error:  # pylint: disable=broad-except
+                _LOGGER.debug(f"Sending to {self.ip_address} failed, queueing command: {error!r}")
+                self._commands.discard(request_id)
+                return self._outbox.put(data, timeout)
+            return ack
+
+        async with self._session.post(
+            url=f"https://{self.ip_address}/api/v1/command",
+            ssl=self.ssl,
+            headers=self._headers,
+            data=json.dumps(data),
+        ) as response:
+            state = await response.json()
 
-            function_value = state[assembly]["components"][component][function]
-            self.assemblies[assembly].components[component].functions[function] = function_value  # fmt: skip
+        await self.process_state(state)
+        ack = asyncio.get_running_loop().create_future()
+        ack.set_result(state)
+        return ack
+
+    async def flush_outbox(self):
+        """Replay the commands queued while the websocket was down"""
+        for payload, timeout, futures in self._outbox.drain():
+            ack = await self.send_payload(payload, timeout)
+            chain_future(ack, futures)
+
+    async def send_coalesced_command(
+        self, assembly: str, component: str, function: str, command: dict
+    ) -> asyncio.Future:
+        """Send a command, collapsing it with newer ones for the same function
+
+        Use this for rapidly repeated values such as slider drags, where only
+        the latest value matters.
+        """
+        return self._coalescer.submit(assembly, component, function, command)
+
+    async def wait_for_commands(self) -> bool:
+        """Wait for every command still in flight or waiting to be coalesced
+
+        :return: True if all of them were acknowledged by the device
+        """
+        futures = [*self._commands.in_flight(), *self._coalescer.waiting()]
+        if not futures:
+            return True
+        # Unlike gather, wait leaves the shared futures alone if this caller is cancelled
+        await asyncio.wait(futures)
+        return not any(future.cancelled() or future.exception() is not None for future in futures)
+
+    @property
+    def command_stats(self) -> dict:
+        """Return command counters, acknowledgement latencies, coalescing and outbox counters"""
+        return {**self._commands.stats, **self._coalescer.stats, **self._outbox.stats}
 
     async def ping(self):
         """Ping the device to ensure it's devices
@@ -171,7 +473,8 @@ class SwidgetDevice:
         try:
             async with self._session.get(
                 url=f"https://{self.ip_address}/ping",
-                ssl=self.ssl
+                ssl=self.ssl,
+                headers=self._headers,
             ) as response:
                 return response.text
         except:
@@ -185,7 +488,8 @@ class SwidgetDevice:
         try:
             async with self._session.get(
                 url=f"https://{self.ip_address}/blink?x-user-key=dqMMBX9deuwtkkp784ewTjqo76IYfThV",
-                ssl=self.ssl
+                ssl=self.ssl,
+                headers=self._headers,
             ) as response:
                 return response.text
         except:
@@ -226,7 +530,6 @@ class SwidgetDevice:
         # await self.get_state()
         total_consumption = 0
         for id, properties in self.assemblies['host'].components.items():
-            print(vars(properties))
             total_consumption += properties.functions['power']['current']
         return total_consumption
 
@@ -234,9 +537,19 @@ class SwidgetDevice:
     def realtime_values(self):
         """Get a dict of realtime value attributes from the insert and host
 
+        The dict is built once per state_version and shared by every caller
+        until the next change is applied, so it must not be modified.
+
         :return: A dictionary of insert sensor values and power consumption values
         :rtype: dict
         """
+        if self._realtime_values_version != self.state_version:
+            self._realtime_values = self._build_realtime_values()
+            self._realtime_values_version = self.state_version
+        return self._realtime_values
+
+    def _build_realtime_values(self):
+        """Collect the realtime values from the current assemblies"""
         return_dict = {}
         for feature in self.features:
             return_dict.update(self.get_function_values(feature))
@@ -244,8 +557,25 @@ class SwidgetDevice:
         power_values = self.get_child_consumption("all")
         if power_values:
             return_dict.update(power_values)
+        for meter, energy in self.energy.items():
+            return_dict[f"energy_{meter}"] = energy.kwh
         return return_dict
 
+    def value_paths(self, key: str) -> Optional[List[Tuple[str, str, str]]]:
+        """Return the (assembly, component, function) paths behind a realtime_values key."""
+        if key == "rssi":
+            return [RSSI_PATH]
+        if key.startswith("power_"):
+            return [("host", key[len("power_"):], "power")]
+        if key.startswith("energy_"):
+            return [(ENERGY_ASSEMBLY, key[len("energy_"):], "kwh")]
+        insert = self.assemblies.get("insert")
+        if insert is not None:
+            for component_id, component in insert.components.items():
+                if key in component.functions:
+                    return [("insert", component_id, key)]
+        return None
+
     @property
     def features(self) -> List[str]:
         """Return a set of features that the device supports."""
@@ -303,16 +633,138 @@ class SwidgetDevice:
             return f"<{self.device_type} at {self.ip_address} - update() needed>"
         return f"<{self.device_type} model {self.model} at {self.ip_address}>"
 
+# Values reported by functions that get a typed slot instead of a dict entry
+FUNCTION_VALUES = ("state", "now", "default", "current", "duration")
+# One bit per typed slot, set once the device reported it, even as null
+_VALUE_BITS = {key: 1 << bit for bit, key in enumerate(FUNCTION_VALUES)}
+# Functions exposed as typed attributes of their component
+KNOWN_FUNCTIONS = (
+    "toggle", "level", "power", "timer", "occupied",
+    "temperature", "humidity", "bp", "iaq", "eco2", "tvoc",
+)
+
+
 class SwidgetAssembly:
+    __slots__ = ("type", "components", "id", "error")
+
     def __init__(self, summary: dict):
         self.type = summary["type"]
         self.components = {
-            c["id"]: SwidgetComponent(c["functions"]) for c in summary["components"]
+            sys.intern(c["id"]): SwidgetComponent(c["functions"]) for c in summary["components"]
         }
         self.id = summary.get("id")
         self.error = summary.get("error")
 
+    def __repr__(self):
+        return f"<SwidgetAssembly {self.type} {self.components}>"
+
 
 class SwidgetComponent:
+    """The functions of one component, built once from the summary
+
+    Every function is reachable by name through ``functions`` and the known
+    ones also as attributes, e.g. ``component.toggle.state``.
+    """
+
+    __slots__ = ("functions",) + KNOWN_FUNCTIONS
+
     def __init__(self, functions):
-        self.functions = {f: None for f in functions}
+        self.functions = {}
+        for name in KNOWN_FUNCTIONS:
+            setattr(self, name, None)
+        for name in functions:
+            name = sys.intern(name)
+            function = self.functions[name] = SwidgetFunction(name)
+            if name in KNOWN_FUNCTIONS:
+                setattr(self, name, function)
+
+    def apply(self, name: str, value) -> bool:
+        """Apply the reported value of a function, returning True if it changed"""
+        function = self.functions.get(name)
+        if isinstance(function, SwidgetFunction) and isinstance(value, dict):
+            return function.update(value)
+        if isinstance(value, dict):
+            name = sys.intern(name)
+            function = self.functions[name] = SwidgetFunction(name)
+            if name in KNOWN_FUNCTIONS:
+                setattr(self, name, function)
+            function.update(value)
+            return True
+        # Firmware occasionally reports bare values next to the functions
+        if function == value:
+            return False
+        self.functions[name] = value
+        return True
+
+    def __repr__(self):
+        return f"<SwidgetComponent {self.functions}>"
+
+
+class SwidgetFunction:
+    """The reported values of one function
+
+    The common values live in typed slots and anything else in ``extra``.
+    Indexing works like the dict it replaces: a value that was never
+    reported raises KeyError, one reported as null returns None.
+    """
+
+    __slots__ = ("name", "extra", "_reported") + FUNCTION_VALUES
+
+    def __init__(self, name: str):
+        self.name = name
+        self.extra = None
+        self._reported = 0
+        self.state = None
+        self.now = None
+        self.default = None
+        self.current = None
+        self.duration = None
+
+    def __getitem__(self, key):
+        bit = _VALUE_BITS.get(key)
+        if bit is not None:
+            if self._reported & bit:
+                return getattr(self, key)
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, values: dict) -> bool:
+        """Merge reported values, returning True if any of them changed"""
+        changed = False
+        for key, value in values.items():
+            bit = _VALUE_BITS.get(key)
+            if bit is not None:
+                self._reported |= bit
+                if getattr(self, key) != value:
+                    setattr(self, key, value)
+                    changed = True
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                if self.extra.get(key, _MISSING) != value:
+                    self.extra[sys.intern(key)] = value
+                    changed = True
+        return changed
+
+    def as_dict(self) -> dict:
+        values = {key: getattr(self, key) for key, bit in _VALUE_BITS.items() if self._reported & bit}
+        if self.extra:
+            values.update(self.extra)
+        return values
+
+    def __repr__(self):
+        return f"<SwidgetFunction {self.name} {self.as_dict()}>"
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from .device import SwidgetDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+# Entry setup follows a validated config flow within moments
+DEFAULT_CACHE_TTL = 60
+
+_shared_cache = None
+
+
+def _normalize_mac(mac: str) -> str:
+    return mac.replace(":", "").replace("-", "").lower()
+
+
+class SwidgetDeviceCache:
+    """Recently validated devices, kept for whoever sets them up next
+
+    A device that was just connected to and updated, e.g. by a config flow,
+    can be adopted by the entry setup that follows instead of being fetched
+    again. Entries are found by host or MAC and are only handed out for the
+    same secret key. Entries nobody takes are dropped once their TTL passes.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL):
+        self.ttl = ttl
+        self._devices: Dict[str, Tuple[SwidgetDevice, float]] = {}
+
+    def put(self, device: SwidgetDevice):
+        """Keep a device that has its summary, state and name"""
+        self._expire()
+        entry = (device, time.monotonic() + self.ttl)
+        self._devices[device.ip_address] = entry
+        self._devices[_normalize_mac(device.mac_address)] = entry
+        # Expire on a timer too, a device may be put and never asked for again
+        asyncio.get_running_loop().call_later(self.ttl, self._expire)
+
+    def pop(self, host: str = None, mac: str = None, secret_key: str = None) -> Optional[SwidgetDevice]:
+        """Take a cached device out of the cache, or return None
+
+        :param secret_key: The key the caller would connect with, a device
+            validated with another key is not handed out
+        """
+        self._expire()
+        entry = None
+        if host is not None:
+            entry = self._devices.get(host)
+        if entry is None and mac is not None:
+            entry = self._devices.get(_normalize_mac(mac))
+        if entry is None:
+            return None
+        device = entry[0]
+        if secret_key is not None and device.secret_key != secret_key:
+            return None
+        self._devices.pop(device.ip_address, None)
+        self._devices.pop(_normalize_mac(device.mac_address), None)
+        _LOGGER.debug("Adopting the validated device at %s", device.ip_address)
+        return device
+
+    def discard(self, host: str = None, mac: str = None):
+        """Drop a cached device, e.g. when the flow that validated it is aborted"""
+        entry = None
+        if host is not None:
+            entry = self._devices.get(host)
+        if entry is None and mac is not None:
+            entry = self._devices.get(_normalize_mac(mac))
+        if entry is not None:
+            device = entry[0]
+            self._devices.pop(device.ip_address, None)
+            self._devices.pop(_normalize_mac(device.mac_address), None)
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (device, expires) in self._devices.items() if expires <= now]:
+            del self._devices[key]
+
+    def __len__(self) -> int:
+        return len({id(device) for device, expires in self._devices.values()})
+
+
+def get_device_cache() -> SwidgetDeviceCache:
+    """Return the process-wide cache of validated devices."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SwidgetDeviceCache()
+    return _shared_cache
@@ -1,8 +1,10 @@
 import asyncio
+import ipaddress
 import json
 import logging
 import socket
-from typing import Awaitable, Callable, Dict, Optional, Type, cast
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple, Type, cast
 from urllib.parse import urlparse
 
 import ssdp
@@ -16,65 +18,373 @@ from .exceptions import SwidgetException
 
 RESPONSE_SEC = 5
 SWIDGET_ST = "urn:swidget:pico:1"
+SSDP_PORT = 1900
+# Announcements without a usable CACHE-CONTROL are trusted for this long
+DEFAULT_MAX_AGE = 1800
+EXPIRY_CHECK_INTERVAL = 60
+DISCOVERY_ADDED = "added"
+DISCOVERY_CHANGED = "changed"
+DISCOVERY_REMOVED = "removed"
 _LOGGER = logging.getLogger(__name__)
-devices = dict()
 
 
 class SwidgetDiscoveredDevice:
-    def __init__(self, mac: str, host: str, friendly_name: str = "Swidget Discovered Device"):
+    def __init__(self, mac: str, host: str, friendly_name: str = "Swidget Discovered Device",
+                 version: str = None, device_type: str = None, insert_type: str = None,
+                 interface: str = None):
         self.mac = mac
         self.host = host
         self.friendly_name = friendly_name
+        self.version = version
+        self.device_type = device_type
+        self.insert_type = insert_type
+        # The local IPv4 address of the interface the device was found on
+        self.interface = interface
+
+    def __eq__(self, other):
+        # Being heard on another interface does not make it a different device
+        if not isinstance(other, SwidgetDiscoveredDevice):
+            return NotImplemented
+        return (self.mac, self.host, self.friendly_name, self.version, self.device_type, self.insert_type) == (
+            other.mac, other.host, other.friendly_name, other.version, other.device_type, other.insert_type)
+
+    def __repr__(self):
+        return f"<SwidgetDiscoveredDevice {self.mac} {self.host} {self.friendly_name!r}>"
+
+
+def _parse_server(server: str) -> Dict[str, Optional[str]]:
+    """Split a SERVER header like 'X dimmer+USB/1.2.3/"Kitchen"' into its parts"""
+    parts = {"device_type": None, "insert_type": None, "version": None, "friendly_name": None}
+    try:
+        product = server.split(" ")[1]
+        parts["device_type"] = product.split("+")[0]
+        parts["insert_type"] = product.split("+")[1].split("/")[0]
+        parts["version"] = server.split("/")[1]
+        parts["friendly_name"] = server.split("/")[2].strip('"')
+    except IndexError:
+        _LOGGER.debug("Unexpected SSDP SERVER header: %s", server)
+    return parts
+
+
+def _parse_max_age(cache_control: Optional[str]) -> int:
+    """Return the max-age of a CACHE-CONTROL header"""
+    if cache_control:
+        for directive in cache_control.split(","):
+            name, _, value = directive.strip().partition("=")
+            if name.lower() == "max-age" and value.strip().isdigit():
+                return int(value)
+    return DEFAULT_MAX_AGE
 
 
 class SwidgetProtocol(ssdp.SimpleServiceDiscoveryProtocol):
-    """Protocol to handle responses and requests."""
+    """Protocol passing Swidget search responses and announcements on as headers."""
+
+    def __init__(self, on_message: Callable[[Dict[str, str], Optional[str]], None], interface: str = None):
+        self.on_message = on_message
+        self.interface = interface
+
+    def datagram_received(self, data, addr):
+        try:
+            super().datagram_received(data, addr)
+        except (ValueError, UnicodeDecodeError):
+            _LOGGER.debug("Ignoring malformed SSDP datagram from %s", addr[0])
+
     def response_received(self, response: ssdp.SSDPResponse, addr: tuple):
         "Handle an incoming response."
-        headers = {h[0]: h[1] for h in response.headers}
-        mac_address = headers["USN"].split("-")[-1]
-        ip_address = urlparse(headers["LOCATION"]).hostname
-        if headers["ST"] == SWIDGET_ST:
-            _LOGGER.error(headers["SERVER"])
-            device_type = headers["SERVER"].split(" ")[1].split("+")[0]
-            insert_type = headers["SERVER"].split(" ")[1].split("+")[1].split("/")[0]
-            friendly_name = headers["SERVER"].split("/")[2].strip('"')
-            devices[mac_address] = SwidgetDiscoveredDevice(mac_address, ip_address, friendly_name)
-
-async def discover_devices():
-    loop = asyncio.get_event_loop()
-    transport, protocol = await loop.create_datagram_endpoint(
-        SwidgetProtocol, family=socket.AF_INET
-    )
-
-    # Send out an M-SEARCH request, requesting Swidget service types.
-    search_request = ssdp.SSDPRequest(
-        "M-SEARCH",
-        headers={
-            "HOST": "239.255.255.250:1900",
-            "MAN": '"ssdp:discover"',
-            "MX": RESPONSE_SEC,
-            "ST": SWIDGET_ST,
-        },
-    )
-    search_request.sendto(transport, (SwidgetProtocol.MULTICAST_ADDRESS, 1900))
-    await asyncio.sleep(RESPONSE_SEC)
-    _LOGGER.debug(f"Found the following Swidget devices from SSDP discovery: {devices}")
-    return devices
-
-async def discover_single(host: str, password: str, ssl: bool) -> SwidgetDevice:
+        headers = {name.upper(): value for name, value in response.headers}
+        if headers.get("ST") == SWIDGET_ST:
+            self.on_message(headers, self.interface)
+
+    def request_received(self, request: ssdp.SSDPRequest, addr: tuple):
+        "Handle an incoming NOTIFY announcement, other requests are ignored."
+        if request.method != "NOTIFY":
+            return
+        headers = {name.upper(): value for name, value in request.headers}
+        if headers.get("NT") == SWIDGET_ST:
+            self.on_message(headers, self.interface)
+
+    def error_received(self, exc):
+        _LOGGER.debug("SSDP socket error: %s", exc)
+
+    def connection_lost(self, exc):
+        # The base class stops the event loop here, which must not happen in HA
+        if exc is not None:
+            _LOGGER.debug("SSDP socket closed: %s", exc)
+
+
+class SwidgetDiscovery:
+    """A long-lived SSDP listener keeping a table of the Swidget devices around
+
+    Devices are learned from M-SEARCH responses and from the NOTIFY
+    announcements they multicast, and are forgotten on ssdp:byebye or once
+    their max-age runs out. Listeners only hear about added, changed and
+    removed devices.
+
+    With interfaces, e.g. ["192.168.1.10/24", "10.0.20.2/24"], searches go
+    out on each of them and the multicast group is joined on each of them,
+    so devices on every VLAN the host is attached to are found. Without, the
+    interface the OS routes multicast to is used.
+    """
+
+    def __init__(self, listen: bool = True, interfaces: Iterable[str] = None):
+        self.listen = listen
+        self.interfaces = [ipaddress.ip_interface(interface) for interface in interfaces or ()]
+        self.devices: Dict[str, SwidgetDiscoveredDevice] = {}
+        self._expires: Dict[str, float] = {}
+        self._listeners = []
+        self._waiters = []
+        self._transports = []
+        self._search_transports = []
+        self._expiry_handle = None
+
+    async def start(self):
+        """Open a search socket per interface and, if possible, join the SSDP multicast group"""
+        loop = asyncio.get_running_loop()
+        for interface in [str(interface.ip) for interface in self.interfaces] or [None]:
+            try:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda interface=interface: SwidgetProtocol(self._handle_message, interface),
+                    sock=_search_socket(interface),
+                )
+            except OSError as ex:
+                _LOGGER.warning("Not searching for Swidget devices on %s: %s", interface, ex)
+                continue
+            self._transports.append(transport)
+            self._search_transports.append(transport)
+        if self.listen:
+            try:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: SwidgetProtocol(self._handle_message),
+                    sock=_multicast_socket([str(interface.ip) for interface in self.interfaces]),
+                )
+                self._transports.append(transport)
+            except OSError as ex:
+                _LOGGER.warning("Not listening for Swidget announcements: %s", ex)
+        self._expiry_handle = loop.call_later(EXPIRY_CHECK_INTERVAL, self._expire)
+
+    def stop(self):
+        """Close every socket and stop expiring devices"""
+        if self._expiry_handle is not None:
+            self._expiry_handle.cancel()
+            self._expiry_handle = None
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+        self._search_transports = []
+        for expected, future in self._waiters:
+            if not future.done():
+                future.set_result(None)
+
+    def add_listener(self, listener: Callable[[str, SwidgetDiscoveredDevice], None]) -> Callable[[], None]:
+        """Call listener(event, device) for every added, changed or removed device
+
+        :return: A function that removes the listener again
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    async def search(self, timeout: float = RESPONSE_SEC, expected: Iterable[str] = None) -> Dict[str, SwidgetDiscoveredDevice]:
+        """Send an M-SEARCH on every interface and collect the answers
+
+        All interfaces share one response window, answers are merged by MAC.
+
+        :param timeout: Seconds devices have to answer
+        :param expected: MAC addresses to wait for, the search returns as soon
+            as all of them are known instead of waiting the full timeout
+        :return: The device table
+        """
+        if not self._search_transports:
+            raise SwidgetException("Discovery has not been started")
+        request = ssdp.SSDPRequest(
+            "M-SEARCH",
+            headers={
+                "HOST": f"{SwidgetProtocol.MULTICAST_ADDRESS}:{SSDP_PORT}",
+                "MAN": '"ssdp:discover"',
+                "MX": max(1, int(timeout)),
+                "ST": SWIDGET_ST,
+            },
+        )
+        for transport in self._search_transports:
+            request.sendto(transport, (SwidgetProtocol.MULTICAST_ADDRESS, SSDP_PORT))
+        expected = set(expected or ())
+        if expected and expected <= self.devices.keys():
+            return self.devices
+        future = asyncio.get_running_loop().create_future()
+        waiter = (expected, future)
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters.remove(waiter)
+        _LOGGER.debug(f"Found the following Swidget devices from SSDP discovery: {self.devices}")
+        return self.devices
+
+    def _handle_message(self, headers: Dict[str, str], interface: Optional[str]):
+        """Update the device table from a search response or an announcement"""
+        usn = headers.get("USN")
+        if not usn:
+            return
+        mac_address = usn.split("-")[-1]
+        if headers.get("NTS") == "ssdp:byebye":
+            self._remove(mac_address)
+            return
+        location = headers.get("LOCATION")
+        if not location:
+            return
+        server = _parse_server(headers.get("SERVER", ""))
+        device = SwidgetDiscoveredDevice(
+            mac_address,
+            urlparse(location).hostname,
+            server["friendly_name"] or "Swidget Discovered Device",
+            version=server["version"],
+            device_type=server["device_type"],
+            insert_type=server["insert_type"],
+            interface=self._interface_for(urlparse(location).hostname) or interface,
+        )
+        self._expires[mac_address] = time.monotonic() + _parse_max_age(headers.get("CACHE-CONTROL"))
+        known = self.devices.get(mac_address)
+        if known == device:
+            if device.interface is not None:
+                known.interface = device.interface
+            return
+        if known is not None and device.interface is None:
+            device.interface = known.interface
+        _LOGGER.debug("SSDP %s from %s: %s", "change" if known else "discovery", device.host, headers.get("SERVER"))
+        self.devices[mac_address] = device
+        self._notify(DISCOVERY_CHANGED if known else DISCOVERY_ADDED, device)
+        for expected, future in self._waiters:
+            if expected and expected <= self.devices.keys() and not future.done():
+                future.set_result(None)
+
+    def _interface_for(self, host: Optional[str]) -> Optional[str]:
+        """Return the interface whose network holds host"""
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return None
+        for interface in self.interfaces:
+            if address in interface.network:
+                return str(interface.ip)
+        return None
+
+    def _remove(self, mac_address: str):
+        self._expires.pop(mac_address, None)
+        device = self.devices.pop(mac_address, None)
+        if device is not None:
+            self._notify(DISCOVERY_REMOVED, device)
+
+    def _expire(self):
+        """Forget the devices whose announcements ran out"""
+        now = time.monotonic()
+        for mac_address in [mac for mac, expires in self._expires.items() if expires <= now]:
+            self._remove(mac_address)
+        self._expiry_handle = asyncio.get_running_loop().call_later(EXPIRY_CHECK_INTERVAL, self._expire)
+
+    def _notify(self, event: str, device: SwidgetDiscoveredDevice):
+        for listener in list(self._listeners):
+            try:
+                listener(event, device)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error in Swidget discovery listener")
+
+
+class SwidgetDiscoveryIndex:
+    """What was last seen of every device, to tell new devices from repeats
+
+    A device needs attention, e.g. a config flow, only the first time its MAC
+    shows up or when its address changed. Everything else is counted as
+    avoided.
+    """
+
+    def __init__(self):
+        self._known: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {}
+        self.started = 0
+        self.avoided = 0
+
+    def seed(self, mac: str, host: str):
+        """Record a device known from elsewhere, e.g. an existing config entry"""
+        self._known.setdefault(mac, (host, None, None))
+
+    def is_new(self, mac: str, device: SwidgetDiscoveredDevice) -> bool:
+        """Record a discovered device, returning True if it is new or moved"""
+        known = self._known.get(mac)
+        self._known[mac] = (device.host, device.version, device.friendly_name)
+        if known is not None and known[0] == device.host:
+            self.avoided += 1
+            return False
+        self.started += 1
+        return True
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+
+def _search_socket(interface: Optional[str]) -> socket.socket:
+    """Return a socket sending multicast out of an interface, or the default one"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        if interface is not None:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+            sock.bind((interface, 0))
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _multicast_socket(interfaces: Iterable[str] = ()) -> socket.socket:
+    """Return a socket bound to the SSDP port that receives the multicast announcements"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        # Other SSDP listeners on the host, e.g. Home Assistant's own, share the port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", SSDP_PORT))
+        for interface in interfaces or ["0.0.0.0"]:
+            membership = socket.inet_aton(SwidgetProtocol.MULTICAST_ADDRESS) + socket.inet_aton(interface)
+            try:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+            except OSError as ex:
+                _LOGGER.warning("Not listening for Swidget announcements on %s: %s", interface, ex)
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+async def discover_devices(timeout: float = RESPONSE_SEC, expected: Iterable[str] = None,
+                           interfaces: Iterable[str] = None) -> Dict[str, SwidgetDiscoveredDevice]:
+    """Search for Swidget devices once, without keeping a listener around
+
+    :param expected: MAC addresses to wait for before returning early
+    :param interfaces: Local IPv4 interfaces to search on, e.g. 192.168.1.10/24
+    """
+    discovery = SwidgetDiscovery(listen=False, interfaces=interfaces)
+    await discovery.start()
+    try:
+        return dict(await discovery.search(timeout, expected))
+    finally:
+        discovery.stop()
+
+async def discover_single(host: str, password: str, ssl: bool, telemetry: bool = True) -> SwidgetDevice:
     """Discover a single device by the given IP address.
 
     :param host: Hostname of device to query
+    :param telemetry: False to not keep a history of the sensor values
     :rtype: SwidgetDevice
     :return: Object for querying/controlling found device.
     """
-    swidget_device = SwidgetDevice(host, password, ssl)
+    swidget_device = SwidgetDevice(host, password, ssl, telemetry=telemetry)
     await swidget_device.get_summary()
-    device_type = swidget_device.device_type
-    device_class = _get_device_class(device_type)
-    dev = device_class(host, password, False)
-    await dev.update()
+    device_class = _get_device_class(swidget_device.device_type)
+    # Reuse the summary and session instead of building a second device
+    dev = swidget_device.specialize(device_class)
+    await dev.update(concurrent=True)
     return dev
 
 def _get_device_class(device_type: str) -> Type[SwidgetDevice]:
@@ -0,0 +1,80 @@
+import time
+
+# Longer silences are treated as outages and not integrated. Websocket devices
+# only report power when it changes, and the coordinator refreshes at least
+# every 10 minutes, so a steady load is never mistaken for an outage.
+DEFAULT_MAX_GAP = 900
+# Watt-seconds per kilowatt-hour
+JOULES_PER_KWH = 3600000
+# Energy sensors show three decimals, smaller increments are not published
+DEFAULT_PUBLISH_STEP = 0.001
+# Without a power change the meters are brought up to date this often
+DEFAULT_METER_INTERVAL = 60
+
+
+class SwidgetEnergyMeter:
+    """Integrate power readings into kWh with the trapezoidal rule
+
+    Each reading closes the interval since the previous one, so the energy is
+    accumulated once as readings arrive rather than recomputed from history.
+    """
+
+    __slots__ = ("kwh", "max_gap", "publish_step", "gaps", "restored", "_last_time", "_last_power", "_published")
+
+    def __init__(self, kwh: float = 0.0, max_gap: float = DEFAULT_MAX_GAP,
+                 publish_step: float = DEFAULT_PUBLISH_STEP):
+        self.kwh = kwh
+        self.max_gap = max_gap
+        self.publish_step = publish_step
+        self.gaps = 0
+        self.restored = False
+        self._published = kwh
+        self._last_time = None
+        self._last_power = None
+
+    def add(self, power: float, timestamp: float = None):
+        """Account for the energy used since the previous reading of power in watts"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self._last_time is not None:
+            elapsed = timestamp - self._last_time
+            if elapsed > self.max_gap:
+                self.gaps += 1
+            elif elapsed > 0:
+                self.kwh += (self._last_power + power) / 2 * elapsed / JOULES_PER_KWH
+        self._last_time = timestamp
+        self._last_power = power
+
+    def hold(self, timestamp: float = None):
+        """Account for the previous reading staying unchanged up to timestamp
+
+        Devices report power when it changes, so a new reading starts at the
+        moment it arrives rather than ramping up from the previous one.
+        """
+        if self._last_power is not None:
+            self.add(self._last_power, timestamp)
+
+    def publish(self) -> bool:
+        """Return True, once, when the total has moved by at least publish_step since last time"""
+        if abs(self.kwh - self._published) < self.publish_step:
+            return False
+        self._published = self.kwh
+        return True
+
+    def restore(self, kwh: float) -> bool:
+        """Continue counting from a total saved before a restart
+
+        Only the first restore counts, the meter outlives entities that are
+        added again and would otherwise add their saved total once more.
+
+        :return: False if the meter was already restored
+        """
+        if self.restored:
+            return False
+        self.restored = True
+        self.kwh += kwh
+        self._published = self.kwh
+        return True
+
+    def __repr__(self):
+        return f"<SwidgetEnergyMeter {self.kwh:.3f} kWh>"
@@ -1,2 +1,6 @@
 class SwidgetException(Exception):
     """Base exception for device errors."""
+
+
+class SwidgetCommandTimeout(SwidgetException):
+    """Raised when a device does not acknowledge a command in time."""
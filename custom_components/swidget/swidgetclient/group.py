@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable
+
+from .commands import DEFAULT_COMMAND_TIMEOUT
+from .device import SwidgetDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_GROUP_CONCURRENCY = 16
+DEFAULT_GROUP_TIMEOUT = DEFAULT_COMMAND_TIMEOUT
+
+
+class SwidgetGroupResult:
+    """The outcome of a group command on one device"""
+
+    def __init__(self, device: SwidgetDevice, success: bool, latency: float, error: str = None):
+        self.device = device
+        self.success = success
+        self.latency = latency
+        self.error = error
+
+    def as_dict(self) -> dict:
+        return {
+            "host": self.device.ip_address,
+            "success": self.success,
+            "latency": round(self.latency, 3),
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"<SwidgetGroupResult {self.device.ip_address} success={self.success}>"
+
+
+async def send_group_command(
+    devices: Iterable[SwidgetDevice],
+    assembly: str,
+    component: str,
+    function: str,
+    command: dict,
+    concurrency: int = DEFAULT_GROUP_CONCURRENCY,
+    timeout: float = DEFAULT_GROUP_TIMEOUT,
+) -> Dict[str, SwidgetGroupResult]:
+    """Send the same command to many devices at once
+
+    At most ``concurrency`` devices are addressed at the same time, and each
+    one has ``timeout`` seconds to acknowledge before it counts as failed.
+
+    :return: The result for every device, keyed by its address
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _send_and_ack(device: SwidgetDevice):
+        ack = await device.send_command(assembly, component, function, command, timeout)
+        return await ack
+
+    async def _send(device: SwidgetDevice) -> SwidgetGroupResult:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(_send_and_ack(device), timeout)
+            except Exception as error:  # pylint: disable=broad-except
+                _LOGGER.warning(f"Group command to {device.ip_address} failed: {error!r}")
+                return SwidgetGroupResult(device, False, time.monotonic() - start, repr(error))
+            return SwidgetGroupResult(device, True, time.monotonic() - start)
+
+    results = await asyncio.gather(*(_send(device) for device in devices))
+    return {result.device.ip_address: result for result in results}
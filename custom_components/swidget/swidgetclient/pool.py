@@ -0,0 +1,69 @@
+import logging
+
+from aiohttp import ClientSession, TCPConnector
+
+_LOGGER = logging.getLogger(__name__)
+
+# Every connected device holds one pooled connection for its websocket, so the
+# total cap has to leave room for the whole fleet plus short-lived HTTP calls.
+DEFAULT_LIMIT = 400
+DEFAULT_LIMIT_PER_HOST = 4
+DEFAULT_KEEPALIVE_TIMEOUT = 60
+
+_shared_pool = None
+
+
+class SwidgetConnectionPool:
+    """A keep-alive HTTP connection pool shared by Swidget devices"""
+
+    def __init__(
+        self,
+        limit=DEFAULT_LIMIT,
+        limit_per_host=DEFAULT_LIMIT_PER_HOST,
+        keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+
+    @property
+    def session(self) -> ClientSession:
+        """Return the pooled session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = ClientSession(connector=connector)
+        return self._session
+
+    @property
+    def closed(self) -> bool:
+        """Return True if the pool has no open session."""
+        return self._session is None or self._session.closed
+
+    async def close(self):
+        """Close the pooled session and every idle connection it holds."""
+        if self._session is not None and not self._session.closed:
+            _LOGGER.debug("Closing the Swidget connection pool")
+            await self._session.close()
+        self._session = None
+
+
+def get_connection_pool() -> SwidgetConnectionPool:
+    """Return the process-wide connection pool."""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = SwidgetConnectionPool()
+    return _shared_pool
+
+
+async def close_connection_pool():
+    """Close the process-wide connection pool if it was ever opened
+
+    Devices keep the pool itself, which opens a new session if used again.
+    """
+    if _shared_pool is not None:
+        await _shared_pool.close()
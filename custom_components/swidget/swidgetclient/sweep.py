@@ -0,0 +1,116 @@
+import asyncio
+import ipaddress
+import logging
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+from .discovery import SwidgetDiscoveredDevice
+from .exceptions import SwidgetException
+from .pool import get_connection_pool
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SWEEP_CONCURRENCY = 64
+# Most addresses in a range have nobody behind them, so give up on them quickly
+DEFAULT_CONNECT_TIMEOUT = 1.0
+DEFAULT_PROBE_TIMEOUT = 3.0
+# A /22 is the largest range swept, anything larger is almost certainly a mistake
+MAX_SWEEP_HOSTS = 1024
+_DONE = object()
+
+
+async def sweep_network(
+    network: str,
+    secret_key: str = None,
+    concurrency: int = DEFAULT_SWEEP_CONCURRENCY,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+    scheme: str = "https",
+    port: int = None,
+    session: aiohttp.ClientSession = None,
+) -> AsyncIterator[SwidgetDiscoveredDevice]:
+    """Find Swidget devices by probing every address of a network over HTTP
+
+    For networks where SSDP multicast does not get through. Every address is
+    asked for /ping and, if that answers, for /api/v1/summary. Devices are
+    yielded as soon as they answer, while the rest of the range is probed.
+
+    :param network: The range to probe in CIDR notation, e.g. 192.168.1.0/24
+    :param secret_key: Sent along if the devices only answer with it
+    :param concurrency: The most probes in flight at a time
+    :param scheme: http or https, devices use https
+    :param port: The port to probe, the scheme's default if None
+    :raises SwidgetException: If the network is invalid or too large
+    """
+    try:
+        hosts = ipaddress.ip_network(network, strict=False)
+    except ValueError as ex:
+        raise SwidgetException(f"Invalid network: {network}") from ex
+    if hosts.num_addresses > MAX_SWEEP_HOSTS:
+        raise SwidgetException(f"Network {network} has more than {MAX_SWEEP_HOSTS} addresses")
+    if hosts.num_addresses == 1:
+        addresses = iter([hosts.network_address])
+    else:
+        addresses = hosts.hosts()
+
+    session = session or get_connection_pool().session
+    headers = {"x-secret-key": secret_key} if secret_key else None
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+    results = asyncio.Queue()
+
+    async def _worker():
+        try:
+            # The workers share the address iterator, each taking the next one
+            for address in addresses:
+                base_url = f"{scheme}://{address}" if port is None else f"{scheme}://{address}:{port}"
+                device = await _probe(session, str(address), base_url, headers, client_timeout)
+                if device is not None:
+                    results.put_nowait(device)
+        finally:
+            results.put_nowait(_DONE)
+
+    workers = [asyncio.create_task(_worker()) for _ in range(max(1, min(concurrency, hosts.num_addresses)))]
+    running = len(workers)
+    try:
+        while running:
+            result = await results.get()
+            if result is _DONE:
+                running -= 1
+            else:
+                yield result
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _probe(
+    session: aiohttp.ClientSession,
+    host: str,
+    base_url: str,
+    headers: Optional[dict],
+    timeout: aiohttp.ClientTimeout,
+) -> Optional[SwidgetDiscoveredDevice]:
+    """Return the device answering at base_url, or None if it is not a Swidget device"""
+    try:
+        async with session.get(f"{base_url}/ping", ssl=False, headers=headers, timeout=timeout) as response:
+            if response.status != 200:
+                return None
+        async with session.get(f"{base_url}/api/v1/summary", ssl=False, headers=headers, timeout=timeout) as response:
+            if response.status != 200:
+                _LOGGER.debug("%s answered /ping but not /api/v1/summary: %s", host, response.status)
+                return None
+            summary = await response.json(content_type=None)
+        device_type = summary["host"]["type"]
+        insert_type = summary["insert"]["type"]
+        return SwidgetDiscoveredDevice(
+            summary["mac"],
+            host,
+            f"Swidget {device_type} w/{insert_type} insert",
+            version=summary.get("version"),
+            device_type=device_type,
+            insert_type=insert_type,
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, TypeError):
+        return None
@@ -8,10 +8,10 @@ import logging
 
 log = logging.getLogger(__name__)
 class SwidgetDimmer(SwidgetDevice):
+    _device_type = "dimmer"
 
     def __init__(self, host,  secret_key: str, ssl: bool) -> None:
         super().__init__(host=host, secret_key=secret_key, ssl=ssl)
-        self._device_type = "dimmer"
 
     @property  # type: ignore
     def brightness(self) -> int:
@@ -21,19 +21,23 @@ class SwidgetDimmer(SwidgetDevice):
         """
         if not self.is_dimmable:
             raise SwidgetException("Device is not dimmable.")
-        try:
-            return self.assemblies['host'].components["0"].functions["level"]["now"]
-        except KeyError:
-            return self.assemblies['host'].components["0"].functions["level"]["default"]
+        level = self._main_component.level
+        if level.now is not None:
+            return level.now
+        return level.default
 
     async def set_brightness(self, brightness):
-        """Set the brightness of the device."""
-        await self.send_command(
+        """Set the brightness of the device.
+
+        Bursts of calls, as sent while dragging a slider, are collapsed into
+        the latest value.
+        """
+        return await self.send_coalesced_command(
             assembly="host", component="0", function="level", command={"now": brightness}
         )
 
     async def set_default_brightness(self, brightness):
-        await self.send_command(
+        return await self.send_coalesced_command(
             assembly="host", component="0", function="level", command={"default": brightness}
         )
 
@@ -45,11 +49,7 @@ class SwidgetDimmer(SwidgetDevice):
     @property  # type: ignore
     def is_on(self) -> bool:
         """Return whether device is on."""
-        test = self.assemblies['host'].components["0"].functions
-        dimmer_state = self.assemblies['host'].components["0"].functions['toggle']["state"]
-        if dimmer_state == "on":
-            return True
-        return False
+        return self._main_component.toggle.state == "on"
 
     async def turn_on(self):
         """Turn the device on."""
@@ -77,7 +77,4 @@ class SwidgetDimmer(SwidgetDevice):
     @property  # type: ignore
     def usb_is_on(self) -> bool:
         """Return whether USB is on."""
-        usb_state = self.assemblies['insert'].components["usb"].functions['toggle']["state"]
-        if usb_state == "on":
-            return True
-        return False
\ No newline at end of file
+        return self._usb_component.toggle.state == "on"
\ No newline at end of file
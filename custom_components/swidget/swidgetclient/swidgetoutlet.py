@@ -5,18 +5,15 @@ from .device import (
 
 
 class SwidgetOutlet(SwidgetDevice):
+    _device_type = DeviceType.Outlet
 
     def __init__(self, host,  secret_key: str, ssl: bool) -> None:
         super().__init__(host=host, secret_key=secret_key, ssl=ssl)
-        self._device_type = DeviceType.Outlet
 
     @property  # type: ignore
     def is_on(self) -> bool:
         """Return whether device is on."""
-        dimmer_state = self.assemblies['host'].components["0"].functions['toggle']["state"]
-        if dimmer_state == "on":
-            return True
-        return False
+        return self._main_component.toggle.state == "on"
 
     async def turn_on(self):
         """Turn the device on."""
@@ -44,7 +41,4 @@ class SwidgetOutlet(SwidgetDevice):
     @property  # type: ignore
     def usb_is_on(self) -> bool:
         """Return whether USB is on."""
-        usb_state = self.assemblies['insert'].components["usb"].functions['toggle']["state"]
-        if usb_state == "on":
-            return True
-        return False
\ No newline at end of file
+        return self._usb_component.toggle.state == "on"
\ No newline at end of file
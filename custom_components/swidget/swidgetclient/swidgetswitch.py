@@ -4,10 +4,10 @@ from .device import (
 )
 
 class SwidgetSwitch(SwidgetDevice):
+    _device_type = DeviceType.Switch
 
     def __init__(self, host,  secret_key: str, ssl: bool) -> None:
         super().__init__(host=host, secret_key=secret_key, ssl=ssl)
-        self._device_type = DeviceType.Switch
 
     async def current_consumption(self) -> float:
         """Get the current power consumption in watts."""
@@ -17,10 +17,7 @@ class SwidgetSwitch(SwidgetDevice):
     @property  # type: ignore
     def is_on(self) -> bool:
         """Return whether device is on."""
-        dimmer_state = self.assemblies['host'].components["0"].functions['toggle']["state"]
-        if dimmer_state == "on":
-            return True
-        return False
+        return self._main_component.toggle.state == "on"
 
     async def turn_on(self):
         """Turn the device on."""
@@ -48,7 +45,4 @@ class SwidgetSwitch(SwidgetDevice):
     @property  # type: ignore
     def usb_is_on(self) -> bool:
         """Return whether USB is on."""
-        usb_state = self.assemblies['insert'].components["usb"].functions['toggle']["state"]
-        if usb_state == "on":
-            return True
-        return False
\ No newline at end of file
+        return self._usb_component.toggle.state == "on"
\ No newline at end of file
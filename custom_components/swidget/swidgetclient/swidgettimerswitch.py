@@ -4,10 +4,10 @@ from .device import (
 from .swidgetswitch import SwidgetSwitch
 
 class SwidgetTimerSwitch(SwidgetSwitch):
+    _device_type = DeviceType.TimerSwitch
 
     def __init__(self, host,  secret_key: str, ssl: bool) -> None:
         super().__init__(host=host, secret_key=secret_key, ssl=ssl)
-        self._device_type = DeviceType.TimerSwitch
 
     async def set_countdown_timer(self, minutes):
         """Set the countdown timer."""
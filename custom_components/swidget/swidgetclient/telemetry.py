@@ -0,0 +1,198 @@
+import time
+from array import array
+from typing import Callable, Dict, List, Optional
+
+# Raw samples kept per metric, at one sample per change this is hours of history
+DEFAULT_CAPACITY = 720
+# Rollup resolutions in seconds, each keeping its last ROLLUP_BUCKETS buckets
+ROLLUP_RESOLUTIONS = {"1m": 60, "15m": 900, "1h": 3600}
+ROLLUP_BUCKETS = 96
+# Values changing faster than this are sampled, a power reading can change with every frame
+DEFAULT_MIN_INTERVAL = 1.0
+# The functions recorded from state messages and the value read from each
+TELEMETRY_FUNCTIONS = {
+    "power": "current",
+    "temperature": "now",
+    "humidity": "now",
+    "bp": "now",
+    "iaq": "now",
+    "eco2": "now",
+    "tvoc": "now",
+}
+
+
+class SwidgetRollup:
+    """Min/max/mean of a metric over fixed, aligned time buckets
+
+    Samples update the open bucket in place; a sample in a later bucket closes
+    it. Buckets live in preallocated arrays, so memory does not grow.
+    """
+
+    __slots__ = ("resolution", "_starts", "_mins", "_maxs", "_sums", "_counts", "_index", "_size")
+
+    def __init__(self, resolution: int, buckets: int = ROLLUP_BUCKETS):
+        self.resolution = resolution
+        self._starts = array("d", bytes(8 * buckets))
+        self._mins = array("d", bytes(8 * buckets))
+        self._maxs = array("d", bytes(8 * buckets))
+        self._sums = array("d", bytes(8 * buckets))
+        self._counts = array("d", bytes(8 * buckets))
+        self._index = 0
+        self._size = 0
+
+    def add(self, timestamp: float, value: float):
+        """Fold one sample into the bucket it falls in"""
+        start = timestamp - timestamp % self.resolution
+        i = self._index
+        if self._size == 0 or start > self._starts[i]:
+            if self._size:
+                i = self._index = (i + 1) % len(self._starts)
+            self._size = min(self._size + 1, len(self._starts))
+            self._starts[i] = start
+            self._mins[i] = self._maxs[i] = self._sums[i] = value
+            self._counts[i] = 1
+            return
+        if value < self._mins[i]:
+            self._mins[i] = value
+        elif value > self._maxs[i]:
+            self._maxs[i] = value
+        self._sums[i] += value
+        self._counts[i] += 1
+
+    def current(self, now: float = None) -> Optional[dict]:
+        """Return the open bucket, or None before the first sample or once now is past its end"""
+        if self._size == 0:
+            return None
+        if now is not None and now >= self._starts[self._index] + self.resolution:
+            return None
+        return self._bucket(self._index)
+
+    def buckets(self) -> List[dict]:
+        """Return the kept buckets, oldest first"""
+        length = len(self._starts)
+        first = (self._index - self._size + 1) % length
+        return [self._bucket((first + n) % length) for n in range(self._size)]
+
+    def _bucket(self, i: int) -> dict:
+        return {
+            "start": self._starts[i],
+            "min": self._mins[i],
+            "max": self._maxs[i],
+            "mean": self._sums[i] / self._counts[i],
+            "count": int(self._counts[i]),
+        }
+
+
+class SwidgetMetricSeries:
+    """A fixed-size ring buffer of raw samples and its rollups for one metric
+
+    Every reading is folded into the rollups, so their min and max are
+    exact, while the raw ring may keep only some of them.
+    """
+
+    __slots__ = ("_times", "_values", "_index", "_size", "rollups", "last_time", "last_value")
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._index = 0
+        self._size = 0
+        self.rollups = {name: SwidgetRollup(seconds) for name, seconds in ROLLUP_RESOLUTIONS.items()}
+        self.last_time = None
+        self.last_value = None
+
+    def add(self, timestamp: float, value: float, raw: bool = True):
+        """Record a sample, overwriting the oldest once the buffer is full
+
+        :param raw: False to fold the sample into the rollups only
+        """
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, value)
+        if not raw:
+            return
+        i = self._index
+        self._times[i] = timestamp
+        self._values[i] = value
+        self._index = (i + 1) % len(self._times)
+        if self._size < len(self._times):
+            self._size += 1
+        self.last_time = timestamp
+        self.last_value = value
+
+    def __len__(self) -> int:
+        return self._size
+
+    def samples(self) -> List[List[float]]:
+        """Return the raw [timestamp, value] samples, oldest first"""
+        length = len(self._times)
+        first = (self._index - self._size) % length
+        return [
+            [self._times[(first + n) % length], self._values[(first + n) % length]]
+            for n in range(self._size)
+        ]
+
+    def statistics(self, now: float = None) -> Dict[str, Optional[dict]]:
+        """Return the open bucket of every rollup resolution, None where it has no samples up to now"""
+        return {name: rollup.current(now) for name, rollup in self.rollups.items()}
+
+    def as_dict(self, resolution: str = None) -> dict:
+        """Return the raw samples, or the buckets of one rollup resolution"""
+        if resolution is None or resolution == "raw":
+            return {"resolution": "raw", "samples": self.samples()}
+        return {"resolution": resolution, "buckets": self.rollups[resolution].buckets()}
+
+
+class SwidgetTelemetry:
+    """In-memory history of the numeric sensor values of one device
+
+    Every sample updates the rollups. The raw history only keeps a sample if
+    its value differs from the previous one and at least min_interval
+    seconds have passed since then.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, clock: Callable[[], float] = time.time,
+                 min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.capacity = capacity
+        self.min_interval = min_interval
+        self._clock = clock
+        self._series: Dict[str, SwidgetMetricSeries] = {}
+        self.skipped = 0
+
+    def record(self, metric: str, value: float, timestamp: float = None) -> bool:
+        """Add a sample for a metric, creating its buffers on first use
+
+        :return: False if the sample was left out of the raw history
+        """
+        if timestamp is None:
+            timestamp = self._clock()
+        series = self._series.get(metric)
+        if series is None:
+            series = self._series[metric] = SwidgetMetricSeries(self.capacity)
+        raw = series.last_time is None or (
+            value != series.last_value and timestamp - series.last_time >= self.min_interval)
+        series.add(timestamp, value, raw)
+        if not raw:
+            self.skipped += 1
+        return raw
+
+    def __contains__(self, metric: str) -> bool:
+        return metric in self._series
+
+    @property
+    def metrics(self) -> List[str]:
+        """Return the metrics that have samples"""
+        return list(self._series)
+
+    def statistics(self, metric: str) -> Optional[Dict[str, Optional[dict]]]:
+        """Return the current rollups of a metric, or None if it has no samples"""
+        series = self._series.get(metric)
+        return None if series is None else series.statistics(self._clock())
+
+    def query(self, metric: str = None, resolution: str = None) -> dict:
+        """Return the history of one metric, or of all of them, keyed by metric"""
+        metrics = self.metrics if metric is None else [metric]
+        return {
+            name: self._series[name].as_dict(resolution)
+            for name in metrics
+            if name in self._series
+        }
@@ -0,0 +1,45 @@
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+TRACE_OFF = 0
+# Commands sent and the replies acknowledging them
+TRACE_COMMANDS = 1
+# Every state message, sampled for high-rate message types
+TRACE_STATE = 2
+# Full device dumps after each state message
+TRACE_ALL = 3
+
+# Only one in N messages of these types is traced
+DEFAULT_SAMPLE_RATES = {"DYNAMIC_UPDATE": 20}
+
+
+class SwidgetTracer:
+    """Per-device switch for logging on the message hot paths
+
+    While tracing is off the only cost is comparing ``level``, so callers
+    guard each trace with ``if tracer.level >= TRACE_...``. Messages are
+    logged at debug level with lazy %-formatting, so the logger has to be
+    set to debug for the output to show up.
+    """
+
+    __slots__ = ("name", "level", "sample_rates", "_seen")
+
+    def __init__(self, name: str, level: int = TRACE_OFF, sample_rates: dict = None):
+        self.name = name
+        self.level = level
+        self.sample_rates = DEFAULT_SAMPLE_RATES if sample_rates is None else sample_rates
+        self._seen = {}
+
+    def sampled(self, kind) -> bool:
+        """Return True if this message of the given type should be traced"""
+        rate = self.sample_rates.get(kind, 1)
+        if rate <= 1:
+            return True
+        seen = self._seen.get(kind, 0)
+        self._seen[kind] = seen + 1
+        return seen % rate == 0
+
+    def trace(self, message: str, *args):
+        """Log a trace message for this device"""
+        _LOGGER.debug("[%s] " + message, self.name, *args)
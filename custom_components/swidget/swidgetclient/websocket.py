@@ -2,16 +2,27 @@ import asyncio
 from datetime import datetime
 import logging
 import json
+import random
+import time
 
 import aiohttp
 
+from .pool import SwidgetConnectionPool, get_connection_pool
+from .trace import TRACE_COMMANDS, SwidgetTracer
+
 _LOGGER = logging.getLogger(__name__)
 
 ERROR_AUTH_FAILURE = "Authorization failure"
-ERROR_TOO_MANY_RETRIES = "Too many retries"
 ERROR_UNKNOWN = "Unknown"
 
+# Attempts retried on the fast exponential schedule before settling into slow mode
 MAX_FAILED_ATTEMPTS = 5
+FIRST_RETRY_DELAY = 1
+RETRY_BASE_DELAY = 2
+RETRY_MAX_DELAY = 300
+# Reconnects after a clean close are spread over this window so a fleet
+# that lost its access point does not come back in lockstep
+RECONNECT_STAGGER = 5
 
 STATE_CONNECTED = "connected"
 STATE_DISCONNECTED = "disconnected"
@@ -19,6 +30,39 @@ STATE_STARTING = "starting"
 STATE_STOPPED = "stopped"
 
 
+class SwidgetReconnectBackoff:
+    """Full-jitter exponential backoff that never gives up
+
+    The first retry is fast, the next ones are drawn uniformly from an
+    exponentially growing window, and once ``fast_attempts`` have failed the
+    delay settles between half of and the full ``max_delay`` for good.
+    """
+
+    def __init__(
+        self,
+        first_delay=FIRST_RETRY_DELAY,
+        base_delay=RETRY_BASE_DELAY,
+        max_delay=RETRY_MAX_DELAY,
+        fast_attempts=MAX_FAILED_ATTEMPTS,
+    ):
+        self.first_delay = first_delay
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.fast_attempts = fast_attempts
+
+    def is_slow(self, failed_attempts: int) -> bool:
+        """Return True once the fast retries are used up"""
+        return failed_attempts > self.fast_attempts
+
+    def delay(self, failed_attempts: int) -> float:
+        """Return how long to wait before the next attempt"""
+        if failed_attempts <= 1:
+            return random.uniform(0, self.first_delay)
+        if self.is_slow(failed_attempts):
+            return random.uniform(self.max_delay / 2, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** failed_attempts))
+
+
 class SwidgetWebsocket:
     """Represent a websocket connection to a Swidget Device"""
 
@@ -29,17 +73,35 @@ class SwidgetWebsocket:
         host,
         secret_key,
         callback,
-        session=None,
+        pool: SwidgetConnectionPool = None,
         verify_ssl=False,
+        on_connect=None,
+        backoff=None,
+        tracer=None,
     ):
 
-        self.session = session or aiohttp.ClientSession()
+        self._pool = pool or get_connection_pool()
         self.uri = self._get_uri(host, secret_key)
         self.callback = callback
+        self.on_connect = on_connect
+        self.ws_client = None
         self._ssl = False if verify_ssl is False else None
         self._state = None
         self.failed_attempts = 0
         self._error_reason = None
+        self.backoff = backoff or SwidgetReconnectBackoff()
+        self.tracer = tracer or SwidgetTracer(host)
+        self.connects = 0
+        self.disconnects = 0
+        self.total_failures = 0
+        self.last_error = None
+        self.last_connected = None
+        self.last_retry_delay = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, looked up anew for every connect."""
+        return self._pool.session
 
     @property
     def state(self):
@@ -51,6 +113,43 @@ class SwidgetWebsocket:
         """Set the state."""
         self._state = value
 
+    @property
+    def connected(self) -> bool:
+        """Return True if messages can be sent right now."""
+        return (
+            self._state == STATE_CONNECTED
+            and self.ws_client is not None
+            and not self.ws_client.closed
+        )
+
+    @property
+    def reconnect_stats(self) -> dict:
+        """Return connection and reconnect statistics."""
+        return {
+            "state": self._state,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "failed_attempts": self.failed_attempts,
+            "total_failures": self.total_failures,
+            "slow_mode": self.backoff.is_slow(self.failed_attempts),
+            "last_error": self.last_error,
+            "last_connected": self.last_connected,
+            "last_retry_delay": self.last_retry_delay,
+        }
+
+    async def _retry_later(self, error):
+        """Record a failed attempt and wait out the backoff before the next one."""
+        self.failed_attempts += 1
+        self.total_failures += 1
+        self.last_error = repr(error)
+        self.last_retry_delay = self.backoff.delay(self.failed_attempts)
+        _LOGGER.warning(
+            f"Websocket connection to {self.uri.split('?')[0]} failed "
+            f"(attempt {self.failed_attempts}), retrying in {self.last_retry_delay:.1f}s: {error!r}"
+        )
+        self.state = STATE_DISCONNECTED
+        await asyncio.sleep(self.last_retry_delay)
+
     @staticmethod
     def _get_uri(host, secret_key):
         """Generate the websocket URI"""
@@ -65,8 +164,12 @@ class SwidgetWebsocket:
             async with self.session.ws_connect(self.uri, headers=headers, verify_ssl=False, heartbeat=30) as self.ws_client:
                 self.state = STATE_CONNECTED
                 self.failed_attempts = 0
-                self.send_str(json.dumps({"type": "summary", "request_id": "1"}))
-                self.send_str(json.dumps({"type": "state", "request_id": "2"}))
+                self.connects += 1
+                self.last_connected = time.time()
+                await self.send_str(json.dumps({"type": "summary", "request_id": "1"}))
+                await self.send_str(json.dumps({"type": "state", "request_id": "2"}))
+                if self.on_connect is not None:
+                    await self.on_connect()
                 async for message in self.ws_client:
                     if self.state == STATE_STOPPED:
                         break
@@ -85,37 +188,31 @@ class SwidgetWebsocket:
 
         except aiohttp.ClientResponseError as error:
             if error.code == 401:
+                # Retrying cannot fix a wrong secret key
                 _LOGGER.error(f"Credentials rejected: {error}")
                 self._error_reason = ERROR_AUTH_FAILURE
-            else:
-                _LOGGER.error(f"Unexpected response received: {error}")
-                self._error_reason = ERROR_UNKNOWN
-            self.state = STATE_STOPPED
-        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
-            if self.failed_attempts >= MAX_FAILED_ATTEMPTS:
-                self._error_reason = ERROR_TOO_MANY_RETRIES
                 self.state = STATE_STOPPED
             elif self.state != STATE_STOPPED:
-                retry_delay = min(2 ** (self.failed_attempts - 1) * 30, 300)
-                self.failed_attempts += 1
-                _LOGGER.exception(f"Websocket connection failed, retrying in {retry_delay}s: {error}")
-                self.state = STATE_DISCONNECTED
-                await asyncio.sleep(retry_delay)
+                self._error_reason = ERROR_UNKNOWN
+                await self._retry_later(error)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+            if self.state != STATE_STOPPED:
+                await self._retry_later(error)
         except Exception as error:  # pylint: disable=broad-except
             if self.state != STATE_STOPPED:
                 _LOGGER.exception(f"Unexpected exception occurred: {error}")
                 self._error_reason = ERROR_UNKNOWN
-                self.state = STATE_STOPPED
+                await self._retry_later(error)
         else:
             if self.state != STATE_STOPPED:
                 self.state = STATE_DISCONNECTED
-
-                await asyncio.sleep(5)
+                self.disconnects += 1
+                await asyncio.sleep(random.uniform(0, RECONNECT_STAGGER))
 
     async def send_str(self, message):
-        _LOGGER.error(f"Sending Message: {message}")
-        message = str(message)
-        await self.ws_client.send_str(f'{message}')
+        if self.tracer.level >= TRACE_COMMANDS:
+            self.tracer.trace("Sending message: %s", message)
+        await self.ws_client.send_str(str(message))
 
     async def listen(self):
         """Close the listening websocket."""
@@ -123,7 +220,8 @@ class SwidgetWebsocket:
         while self.state != STATE_STOPPED:
             await self.running()
 
-    def close(self):
+    async def close(self):
         """Close the listening websocket."""
         self.state = STATE_STOPPED
-        self.ws_client.close()
+        if self.ws_client is not None:
+            await self.ws_client.close()
@@ -71,7 +71,7 @@ class SwidgetPlugSwitch(CoordinatedSwidgetEntity, SwitchEntity):
         coordinator: SwidgetDataUpdateCoordinator,
     ) -> None:
         """Initialize the switch."""
-        super().__init__(device, coordinator)
+        super().__init__(device, coordinator, [("host", "0", "toggle")])
         self._attr_name = "Controlled Outlet"
         # self.entity_id = f"{self.device}_controlled_outlet"
         self._attr_unique_id = (
@@ -106,7 +106,7 @@ class SwidgetUSBSwitch(CoordinatedSwidgetEntity, SwitchEntity):
         coordinator: SwidgetDataUpdateCoordinator,
     ) -> None:
         """Initialize the switch."""
-        super().__init__(device, coordinator)
+        super().__init__(device, coordinator, [("insert", "usb", "toggle")])
         self._attr_name = "USB Outlet"
         self._attr_unique_id = (
             f"{self.device}_usb_outlet"